@@ -17,16 +17,70 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 # ── YOLO Models ────────────────────────────────────────────────────────
 PLATE_MODEL_PATH = str(PROJECT_DIR / "plate.pt")
 OCR_MODEL_PATH = str(PROJECT_DIR / "best.pt")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")  # "torch" (.pt weights), "onnx", "openvino" or "openvino-int8"
+MODEL_CACHE_DIR = BASE_DIR / "model_cache"  # exported models, one per weights file and backend
+QUANT_MIN_AGREEMENT = float(os.getenv("QUANT_MIN_AGREEMENT", "0.98"))  # share of FP32 plate reads INT8 must match
+
+# ── Video pipeline ─────────────────────────────────────────────────────
+PLATE_BATCH_SIZE = int(os.getenv("PLATE_BATCH_SIZE", "8"))  # sampled frames per detector call
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "32"))  # plate crops per OCR call
+FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "32"))  # decoded frames buffered ahead of inference
+SAMPLE_FPS = float(os.getenv("SAMPLE_FPS", "0"))  # samples per video second, 0 = every skip_frames-th frame
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "false").lower() == "true"  # sample sparsely until plates appear
+ADAPTIVE_IDLE_FPS = float(os.getenv("ADAPTIVE_IDLE_FPS", "1"))  # sample rate while no plates are in view
+SEEK_MIN_STRIDE = int(os.getenv("SEEK_MIN_STRIDE", "250"))  # seek instead of grab() for strides this long
+MOTION_GATE = os.getenv("MOTION_GATE", "false").lower() == "true"  # skip detection on static frames
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.002"))  # fraction of pixels that must change
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "25"))  # grey-level change that counts as motion
+CHECKPOINT_INTERVAL = int(os.getenv("CHECKPOINT_INTERVAL", "500"))  # sampled frames between job checkpoints, 0 = off
+VIDEO_CHUNK_WORKERS = int(os.getenv("VIDEO_CHUNK_WORKERS", "1"))  # processes per long video, 1 = sequential
+VIDEO_CHUNK_MIN_SECONDS = float(os.getenv("VIDEO_CHUNK_MIN_SECONDS", "600"))  # shorter videos are not split
+TRACK_MAX_MISSED = int(os.getenv("TRACK_MAX_MISSED", "10"))  # sampled frames before a track is finished
+TRACK_MAX_AGE = int(os.getenv("TRACK_MAX_AGE", "0"))  # sampled frames after which a missed track ends at once, 0 = no limit
+TRACK_MAX_LIVE = int(os.getenv("TRACK_MAX_LIVE", "256"))  # hard cap on live tracks, 0 = no limit
+TRACK_MATCHING = os.getenv("TRACK_MATCHING", "greedy")  # "greedy" or "hungarian"
+TRACK_MOTION = os.getenv("TRACK_MOTION", "false").lower() == "true"  # Kalman box prediction
+
+# ── Background jobs ────────────────────────────────────────────────────
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # video jobs processed concurrently
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))  # seconds between queue checks
+PROGRESS_DB_INTERVAL = float(os.getenv("PROGRESS_DB_INTERVAL", "5"))  # max seconds between progress commits
+PROGRESS_DB_STEP = float(os.getenv("PROGRESS_DB_STEP", "5"))  # or commit once progress moved this many percent
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "64"))  # detections stored per batched insert
+PROGRESS_CHANNEL = os.getenv("PROGRESS_CHANNEL", "true").lower() == "true"  # serve running jobs from memory
+PROGRESS_PUBLISH_INTERVAL = float(os.getenv("PROGRESS_PUBLISH_INTERVAL", "0.5"))  # seconds between in-memory updates
+IMAGE_WAIT_TIMEOUT = float(os.getenv("IMAGE_WAIT_TIMEOUT", "30"))  # default seconds an image upload waits for its result
+JOB_EVENTS_KEEPALIVE = float(os.getenv("JOB_EVENTS_KEEPALIVE", "15"))  # seconds between event-stream keepalives
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # claimed job is orphaned if not renewed in time
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # claims before a job is failed for good
+
+# ── Live streams ───────────────────────────────────────────────────────
+STREAMS_ENABLED = os.getenv("STREAMS_ENABLED", "false").lower() == "true"  # run a worker per camera with a stream URL
+STREAM_SAMPLE_FPS = float(os.getenv("STREAM_SAMPLE_FPS", "5"))  # frames per second of stream sent to detection
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "8"))  # decoded frames buffered per stream
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", "1"))  # processes sharing the cameras, one model copy each
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "8"))  # frames from different cameras per detector call
+STREAM_DROP_POLICY = os.getenv("STREAM_DROP_POLICY", "latest")  # "latest" skips stale queued frames, "none" keeps all
+STREAM_METRICS_INTERVAL = float(os.getenv("STREAM_METRICS_INTERVAL", "5"))  # seconds between per-camera metric reports
+STREAM_RECONNECT_DELAY = float(os.getenv("STREAM_RECONNECT_DELAY", "5"))  # seconds before reopening a dropped stream
+STREAM_MONITOR_INTERVAL = float(os.getenv("STREAM_MONITOR_INTERVAL", "10"))  # seconds between stream worker checks
 
 # ── Static files ───────────────────────────────────────────────────────
 STATIC_DIR = BASE_DIR / "static"
 UPLOAD_DIR = STATIC_DIR / "uploads"
 PLATES_DIR = STATIC_DIR / "plates"
 CARS_DIR = STATIC_DIR / "cars"
+CHECKPOINT_DIR = BASE_DIR / "checkpoints"
+PARTIAL_UPLOAD_DIR = BASE_DIR / "partial_uploads"
 
-for d in [UPLOAD_DIR, PLATES_DIR, CARS_DIR]:
+for d in [UPLOAD_DIR, PLATES_DIR, CARS_DIR, CHECKPOINT_DIR, PARTIAL_UPLOAD_DIR]:
     d.mkdir(parents=True, exist_ok=True)
 
+# ── Uploads ────────────────────────────────────────────────────────────
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes written (and hashed) per step
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "10000"))  # images one batch upload may hold
+BATCH_ZIP_MAX_BYTES = int(os.getenv("BATCH_ZIP_MAX_BYTES", str(4 * 1024 ** 3)))  # uncompressed images extracted per batch upload
+
 # ── Allowed file types ─────────────────────────────────────────────────
 ALLOWED_VIDEO_EXT = {".mp4", ".avi", ".mov", ".mkv", ".wmv"}
 ALLOWED_IMAGE_EXT = {".jpg", ".jpeg", ".png", ".bmp"}
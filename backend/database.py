@@ -1,6 +1,6 @@
 """SQLAlchemy database setup."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from config import DATABASE_URL
@@ -22,7 +22,30 @@ def get_db():
         db.close()
 
 
+def _add_missing_columns():
+    """create_all() never alters existing tables; add columns new models gained."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if isinstance(default, bool):
+                    ddl += f" DEFAULT {int(default)}"
+                elif isinstance(default, (int, float)):
+                    ddl += f" DEFAULT {default}"
+                elif isinstance(default, str):
+                    ddl += f" DEFAULT '{default}'"
+                conn.execute(text(ddl))
+
+
 def init_db():
     """Create all tables."""
     import models  # noqa: F401 – ensure models are registered
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
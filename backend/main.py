@@ -7,8 +7,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from config import STATIC_DIR
+from config import STATIC_DIR, STREAMS_ENABLED
 from database import init_db
+from services.jobs import job_executor
+from services.streams import stream_manager
 
 # ── Import routers ─────────────────────────────────────────────────────
 from auth.router import router as auth_router
@@ -60,6 +62,15 @@ app.include_router(settings_router)
 @app.on_event("startup")
 def on_startup():
     init_db()
+    job_executor.start()
+    if STREAMS_ENABLED:
+        stream_manager.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stream_manager.stop()
+    job_executor.stop()
 
 
 @app.get("/api/health")
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Enum
+    Column, Integer, BigInteger, String, Float, Text, DateTime, Boolean, ForeignKey, Enum
 )
 from sqlalchemy.orm import relationship
 import enum
@@ -80,19 +80,42 @@ class Job(Base):
 
     id = Column(String(50), primary_key=True)
     filename = Column(String(200))
-    file_type = Column(String(10))  # "video" or "image"
+    file_type = Column(String(10))  # "video", "image" or "batch"
+    file_path = Column(String(300), nullable=True)
+    parent_id = Column(String(50), ForeignKey("jobs.id"), nullable=True, index=True)  # batch the image belongs to
+    file_hash = Column(String(64), nullable=True)  # SHA-256 of the uploaded file
     status = Column(String(20), default=JobStatus.pending.value)
     progress = Column(Float, default=0.0)
     total_frames = Column(Integer, default=0)
     processed_frames = Column(Integer, default=0)
+    inferred_frames = Column(Integer, default=0)
+    static_frames = Column(Integer, default=0)
     detections_count = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
+    worker_id = Column(String(100), nullable=True)  # lease owner while processing
+    attempts = Column(Integer, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    checkpoint_path = Column(String(300), nullable=True)
+    checkpoint_frame = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
     detections = relationship("Detection", back_populates="job")
 
 
+# ── Resumable upload ───────────────────────────────────────────────────
+
+class Upload(Base):
+    __tablename__ = "uploads"
+
+    id = Column(String(50), primary_key=True)
+    filename = Column(String(200), nullable=False)
+    size = Column(BigInteger, nullable=False)  # announced total; bytes so far are on disk
+    user_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # ── Violation ──────────────────────────────────────────────────────────
 
 class Violation(Base):
@@ -140,6 +163,7 @@ class Camera(Base):
     name = Column(String(50), unique=True, nullable=False)
     location = Column(String(100))
     speed_limit = Column(Float, default=60.0)
+    stream_url = Column(String(300), nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -5,8 +5,9 @@ from sqlalchemy.orm import Session
 
 from database import get_db
 from models import Setting, Camera, User
-from schemas import SettingResponse, SettingUpdate, CameraCreate, CameraResponse
+from schemas import SettingResponse, SettingUpdate, CameraCreate, CameraResponse, CameraStreamMetrics
 from auth.dependencies import get_current_user
+from services.streams import stream_manager
 
 router = APIRouter(prefix="/api/settings", tags=["Settings"])
 
@@ -62,6 +63,14 @@ def list_cameras(db: Session = Depends(get_db)):
     return db.query(Camera).all()
 
 
+@router.get("/cameras/metrics", response_model=list[CameraStreamMetrics])
+def camera_metrics(db: Session = Depends(get_db)):
+    """Latest live-stream metrics of each camera: frames, drops and latency."""
+    camera_ids = {c.id for c in db.query(Camera.id).all()}
+    metrics = stream_manager.metrics()
+    return [metrics[camera_id] for camera_id in sorted(camera_ids) if camera_id in metrics]
+
+
 @router.post("/cameras", response_model=CameraResponse, status_code=201)
 def add_camera(
     data: CameraCreate,
@@ -69,10 +78,16 @@ def add_camera(
     db: Session = Depends(get_db),
 ):
     """Add a new camera."""
-    camera = Camera(name=data.name, location=data.location, speed_limit=data.speed_limit)
+    camera = Camera(
+        name=data.name,
+        location=data.location,
+        speed_limit=data.speed_limit,
+        stream_url=data.stream_url,
+    )
     db.add(camera)
     db.commit()
     db.refresh(camera)
+    stream_manager.sync()
     return camera
 
 
@@ -84,4 +99,5 @@ def delete_camera(camera_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Camera not found")
     db.delete(camera)
     db.commit()
+    stream_manager.sync()
     return {"message": "Camera deleted"}
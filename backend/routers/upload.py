@@ -1,213 +1,364 @@
 """File upload & processing routes."""
 
+import asyncio
+import json
+import shutil
 import uuid
-import threading
+import zipfile
 from pathlib import Path
-from datetime import datetime
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from database import get_db
-from models import Job, Detection, JobStatus, WatchlistEntry, Violation, DetectionStatus
-from schemas import JobResponse
-from config import UPLOAD_DIR, ALLOWED_VIDEO_EXT, ALLOWED_IMAGE_EXT
+from database import get_db, SessionLocal
+from models import Job, JobStatus, Upload
+from schemas import JobResponse, BatchJobResponse, UploadCreate, UploadResponse
+from config import (
+    UPLOAD_DIR, ALLOWED_VIDEO_EXT, ALLOWED_IMAGE_EXT, JOB_EVENTS_KEEPALIVE, IMAGE_WAIT_TIMEOUT,
+    BATCH_MAX_FILES, BATCH_ZIP_MAX_BYTES,
+)
 from auth.dependencies import get_current_user
 from models import User
-from services.detector import process_video, process_image
+from services.jobs import job_executor
+from services.uploads import save_upload, partial_uploads, OffsetMismatch
+from services.progress import progress_channel, job_snapshot, FINISHED_STATUSES
 
 router = APIRouter(prefix="/api", tags=["Upload & Processing"])
 
 
-def _run_video_job(job_id: str, file_path: str, filename: str, db_url: str):
-    """Background thread for video processing."""
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
-    SessionLocal = sessionmaker(bind=engine)
-    db = SessionLocal()
-
-    try:
-        job = db.query(Job).filter(Job.id == job_id).first()
-        job.status = JobStatus.processing.value
-        db.commit()
-
-        def progress_cb(current: int, total: int):
-            job.processed_frames = current
-            job.total_frames = total
-            job.progress = round((current / total) * 100, 1) if total > 0 else 0
-            db.commit()
-
-        results = process_video(file_path, filename, progress_callback=progress_cb)
-
-        # Check watchlist for each detection
-        watchlist_plates = {
-            w.plate_number: w
-            for w in db.query(WatchlistEntry).filter(WatchlistEntry.is_active == True).all()
-        }
-
-        for r in results:
-            status = DetectionStatus.normal.value
-            plate = r["plate_number"]
-
-            # Check watchlist
-            if plate in watchlist_plates:
-                status = DetectionStatus.watchlist.value
-                wl = watchlist_plates[plate]
-                wl.match_count += 1
-                wl.last_seen = datetime.utcnow()
-
-            detection = Detection(
-                plate_number=r["plate_number"],
-                plate_number_arabic=r.get("plate_number_arabic"),
-                governorate=r.get("governorate"),
-                confidence=r.get("confidence"),
-                status=status,
-                frame_number=r.get("frame_number", 0),
-                timestamp_in_video=r.get("timestamp_in_video"),
-                source_file=r.get("source_file"),
-                plate_image_path=r.get("plate_image_path"),
-                car_image_path=r.get("car_image_path"),
-                job_id=job_id,
-            )
-            db.add(detection)
-            db.flush()
-
-            # Create violation for watchlist matches
-            if status == DetectionStatus.watchlist.value:
-                violation = Violation(
-                    detection_id=detection.id,
-                    violation_type="watchlist_match",
-                    description=f"Watchlist match: {watchlist_plates[plate].reason}",
-                    plate_number=plate,
-                    location=detection.location,
-                    camera=detection.camera,
-                )
-                db.add(violation)
-
-        job.status = JobStatus.completed.value
-        job.progress = 100.0
-        job.detections_count = len(results)
-        job.completed_at = datetime.utcnow()
-        db.commit()
-
-    except Exception as e:
-        job = db.query(Job).filter(Job.id == job_id).first()
-        if job:
-            job.status = JobStatus.failed.value
-            job.error_message = str(e)
-            db.commit()
-    finally:
-        db.close()
-
-
 @router.post("/upload", response_model=JobResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    wait: float = Query(IMAGE_WAIT_TIMEOUT, ge=0, description="Seconds to wait for an image result"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Upload a video or image for plate detection."""
-    ext = Path(file.filename).suffix.lower()
+    """Upload a video or image for plate detection.
+
+    Both are queued for the worker pool. For images the response waits up to
+    ``wait`` seconds for the result; a job still pending after that is
+    followed like a video job.
+    """
+    _check_extension(file.filename)
+
+    # Save file
+    file_path = _upload_path(file.filename)
+    file_hash = await save_upload(file, file_path)
+
+    return await _queue_file_job(db, file.filename, file_path, file_hash, wait)
+
+
+def _check_extension(filename: str):
+    ext = Path(filename).suffix.lower()
     if ext not in ALLOWED_VIDEO_EXT and ext not in ALLOWED_IMAGE_EXT:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
-    # Save file
+
+def _upload_path(filename: str) -> Path:
     uid = uuid.uuid4().hex[:8]
-    safe_name = f"{uid}_{file.filename}"
-    file_path = UPLOAD_DIR / safe_name
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    return UPLOAD_DIR / f"{uid}_{Path(filename).name}"
 
-    is_video = ext in ALLOWED_VIDEO_EXT
+
+async def _queue_file_job(db: Session, filename: str, file_path: Path, file_hash: str, wait: float) -> Job:
+    """Queue a stored video or image as a job; wait up to ``wait`` seconds for an image result."""
+    is_video = Path(filename).suffix.lower() in ALLOWED_VIDEO_EXT
     job_id = uuid.uuid4().hex
 
     # Create job record
     job = Job(
         id=job_id,
-        filename=file.filename,
+        filename=filename,
         file_type="video" if is_video else "image",
+        file_path=str(file_path),
+        file_hash=file_hash,
         status=JobStatus.pending.value,
     )
     db.add(job)
     db.commit()
     db.refresh(job)
 
-    if is_video:
-        # Process in background thread
-        from config import DATABASE_URL
-        thread = threading.Thread(
-            target=_run_video_job,
-            args=(job_id, str(file_path), file.filename, DATABASE_URL),
-            daemon=True,
-        )
-        thread.start()
-    else:
-        # Process image synchronously
-        try:
-            results = process_image(str(file_path), file.filename)
-
-            watchlist_plates = {
-                w.plate_number: w
-                for w in db.query(WatchlistEntry).filter(WatchlistEntry.is_active == True).all()
-            }
-
-            for r in results:
-                status = DetectionStatus.normal.value
-                plate = r["plate_number"]
-
-                if plate in watchlist_plates:
-                    status = DetectionStatus.watchlist.value
-                    wl = watchlist_plates[plate]
-                    wl.match_count += 1
-                    wl.last_seen = datetime.utcnow()
-
-                detection = Detection(
-                    plate_number=r["plate_number"],
-                    plate_number_arabic=r.get("plate_number_arabic"),
-                    governorate=r.get("governorate"),
-                    confidence=r.get("confidence"),
-                    status=status,
-                    frame_number=0,
-                    timestamp_in_video="00:00",
-                    source_file=file.filename,
-                    plate_image_path=r.get("plate_image_path"),
-                    car_image_path=r.get("car_image_path"),
-                    job_id=job_id,
-                )
-                db.add(detection)
-                db.flush()
-
-                if status == DetectionStatus.watchlist.value:
-                    violation = Violation(
-                        detection_id=detection.id,
-                        violation_type="watchlist_match",
-                        description=f"Watchlist match: {watchlist_plates[plate].reason}",
-                        plate_number=plate,
+    # Queued as a pending job; the worker pool picks it up
+    job_executor.notify()
+    if not is_video and wait > 0:
+        await job_executor.wait(job_id, wait)
+
+    db.refresh(job)
+    return job
+
+
+# ── Resumable uploads ──────────────────────────────────────────────────
+# POST /uploads announces a file, PATCH appends the raw request body at the
+# Upload-Offset header, GET reports how much arrived (to resume after a
+# dropped connection), and POST /uploads/{id}/complete queues the job.
+
+def _get_upload(db: Session, upload_id: str, user: User) -> Upload:
+    upload = db.query(Upload).filter(Upload.id == upload_id, Upload.user_id == user.id).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def _upload_response(upload: Upload) -> UploadResponse:
+    return UploadResponse(
+        id=upload.id, filename=upload.filename, size=upload.size, offset=partial_uploads.offset(upload.id),
+    )
+
+
+@router.post("/uploads", response_model=UploadResponse, status_code=201)
+def create_upload(
+    data: UploadCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Start a resumable upload."""
+    _check_extension(data.filename)
+    upload = Upload(id=uuid.uuid4().hex, filename=Path(data.filename).name, size=data.size, user_id=current_user.id)
+    db.add(upload)
+    db.commit()
+    partial_uploads.create(upload.id)
+    return _upload_response(upload)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadResponse)
+def get_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Report how many bytes of a resumable upload arrived."""
+    return _upload_response(_get_upload(db, upload_id, current_user))
+
+
+@router.patch("/uploads/{upload_id}", response_model=UploadResponse)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Append the request body to a resumable upload at ``Upload-Offset``."""
+    upload = _get_upload(db, upload_id, current_user)
+    try:
+        await partial_uploads.append(upload.id, upload_offset, request.stream(), limit=upload.size)
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return _upload_response(upload)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=JobResponse)
+async def complete_upload(
+    upload_id: str,
+    wait: float = Query(IMAGE_WAIT_TIMEOUT, ge=0, description="Seconds to wait for an image result"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Finish a resumable upload and queue it for processing like ``POST /upload``."""
+    upload = _get_upload(db, upload_id, current_user)
+    offset = partial_uploads.offset(upload.id)
+    if offset != upload.size:
+        raise HTTPException(status_code=409, detail=f"Upload is at offset {offset} of {upload.size}")
+
+    file_path = _upload_path(upload.filename)
+    file_hash = await run_in_threadpool(partial_uploads.finish, upload.id, file_path)
+    filename = upload.filename
+    db.delete(upload)
+    db.commit()
+    return await _queue_file_job(db, filename, file_path, file_hash, wait)
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def cancel_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Abandon a resumable upload and drop its partial file."""
+    upload = _get_upload(db, upload_id, current_user)
+    partial_uploads.discard(upload.id)
+    db.delete(upload)
+    db.commit()
+
+
+def _save_batch_files(files: list[UploadFile], batch_dir: Path) -> list[tuple[str, Path]]:
+    """Write the images of a batch upload to ``batch_dir``, expanding zip archives.
+
+    Archives are checked against BATCH_MAX_FILES and BATCH_ZIP_MAX_BYTES from
+    their directory before anything is extracted.
+    """
+    saved = []
+    extracted_bytes = 0
+
+    def target(name: str) -> Path:
+        return batch_dir / f"{len(saved):05d}_{name}"
+
+    for upload in files:
+        ext = Path(upload.filename).suffix.lower()
+        if ext in ALLOWED_IMAGE_EXT:
+            if len(saved) >= BATCH_MAX_FILES:
+                raise HTTPException(status_code=413, detail=f"A batch may hold at most {BATCH_MAX_FILES} images")
+            path = target(Path(upload.filename).name)
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+            saved.append((upload.filename, path))
+        elif ext == ".zip":
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Not a valid zip archive: {upload.filename}")
+            with archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and not Path(info.filename).name.startswith(".")
+                    and "__MACOSX" not in info.filename
+                    and Path(info.filename).suffix.lower() in ALLOWED_IMAGE_EXT
+                ]
+                extracted_bytes += sum(info.file_size for info in members)
+                if len(saved) + len(members) > BATCH_MAX_FILES:
+                    raise HTTPException(status_code=413, detail=f"A batch may hold at most {BATCH_MAX_FILES} images")
+                if extracted_bytes > BATCH_ZIP_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413, detail=f"Archives may expand to at most {BATCH_ZIP_MAX_BYTES} bytes per batch",
                     )
-                    db.add(violation)
+                for info in members:
+                    name = Path(info.filename).name
+                    path = target(name)
+                    with archive.open(info) as src, open(path, "wb") as f:
+                        shutil.copyfileobj(src, f)
+                    saved.append((name, path))
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
+    return saved
+
+
+@router.post("/upload/batch", response_model=BatchJobResponse)
+async def upload_batch(
+    files: list[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Upload many images (or zip archives of images) as one batch job.
 
-            job.status = JobStatus.completed.value
-            job.progress = 100.0
-            job.detections_count = len(results)
-            job.completed_at = datetime.utcnow()
-            db.commit()
+    Each image becomes a child job of the returned batch job; their
+    results are listed by ``GET /api/jobs/{job_id}/files``.
+    """
+    job_id = uuid.uuid4().hex
+    batch_dir = UPLOAD_DIR / f"batch_{job_id[:8]}"
+    batch_dir.mkdir()
+    try:
+        images = await run_in_threadpool(_save_batch_files, files, batch_dir)
+    except HTTPException:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+    if not images:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No images in upload")
+
+    job = Job(
+        id=job_id,
+        filename=files[0].filename if len(files) == 1 else f"{len(images)} images",
+        file_type="batch",
+        file_path=str(batch_dir),
+        status=JobStatus.pending.value,
+        total_frames=len(images),
+    )
+    db.add(job)
+    children = [
+        Job(
+            id=uuid.uuid4().hex,
+            filename=name,
+            file_type="image",
+            file_path=str(path),
+            status=JobStatus.pending.value,
+            parent_id=job_id,
+        )
+        for name, path in images
+    ]
+    db.add_all(children)
+    db.commit()
 
-        except Exception as e:
-            job.status = JobStatus.failed.value
-            job.error_message = str(e)
-            db.commit()
+    # Queued as a pending job; the worker pool picks it up
+    job_executor.notify()
 
     db.refresh(job)
-    return job
+    return BatchJobResponse(**JobResponse.model_validate(job).model_dump(), files=children)
 
 
 @router.get("/jobs/{job_id}", response_model=JobResponse)
 def get_job(job_id: str, db: Session = Depends(get_db)):
     """Poll job status and progress."""
+    snapshot = progress_channel.get(job_id)
+    if snapshot is not None:
+        return snapshot
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
+
+
+@router.get("/jobs/{job_id}/files", response_model=list[JobResponse])
+def get_job_files(job_id: str, db: Session = Depends(get_db)):
+    """Per-file results of a batch job."""
+    if not db.query(Job.id).filter(Job.id == job_id).first():
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db.query(Job).filter(Job.parent_id == job_id).order_by(Job.file_path).all()
+
+
+def _job_snapshot_from_db(job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        return job_snapshot(job) if job else None
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Stream job progress and new detections as server-sent events.
+
+    Emits ``progress`` events carrying the job (same shape as ``GET
+    /api/jobs/{job_id}``) and a ``detection`` event per plate as soon as
+    it is stored. The stream ends after the job completes or fails.
+    """
+    queue = progress_channel.subscribe(job_id)
+    snapshot = progress_channel.get(job_id) or await asyncio.to_thread(_job_snapshot_from_db, job_id)
+    if snapshot is None:
+        progress_channel.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        try:
+            yield _sse("progress", snapshot)
+            if snapshot["status"] in FINISHED_STATUSES:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Nothing pushed (e.g. the job finished before we subscribed):
+                    # re-check the stored state, which also keeps the connection alive
+                    event, data = "progress", await asyncio.to_thread(_job_snapshot_from_db, job_id)
+                    if data is None:
+                        return
+                yield _sse(event, data)
+                if event == "progress" and data["status"] in FINISHED_STATUSES:
+                    return
+        finally:
+            progress_channel.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
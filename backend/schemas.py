@@ -80,8 +80,11 @@ class JobResponse(BaseModel):
     progress: float
     total_frames: int
     processed_frames: int
+    inferred_frames: int = 0
+    static_frames: int = 0
     detections_count: int
     error_message: Optional[str]
+    parent_id: Optional[str] = None
     created_at: datetime
     completed_at: Optional[datetime]
 
@@ -89,6 +92,24 @@ class JobResponse(BaseModel):
         from_attributes = True
 
 
+class BatchJobResponse(JobResponse):
+    files: list[JobResponse]
+
+
+# ── Resumable upload ───────────────────────────────────────────────────
+
+class UploadCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=200)
+    size: int = Field(gt=0)
+
+
+class UploadResponse(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int
+
+
 # ── Violation ──────────────────────────────────────────────────────────
 
 class ViolationResponse(BaseModel):
@@ -180,6 +201,7 @@ class CameraCreate(BaseModel):
     name: str
     location: str
     speed_limit: float = 60.0
+    stream_url: Optional[str] = None
 
 
 class CameraResponse(BaseModel):
@@ -187,6 +209,7 @@ class CameraResponse(BaseModel):
     name: str
     location: Optional[str]
     speed_limit: float
+    stream_url: Optional[str] = None
     is_active: bool
     created_at: datetime
 
@@ -194,6 +217,19 @@ class CameraResponse(BaseModel):
         from_attributes = True
 
 
+class CameraStreamMetrics(BaseModel):
+    camera_id: int
+    camera: str
+    connected: bool
+    sampled_frames: int
+    inferred_frames: int
+    dropped_frames: int
+    latency_ms_avg: Optional[float] = None
+    latency_ms_max: Optional[float] = None
+    error: Optional[str] = None  # last failure to store the camera's detections
+    updated_at: datetime
+
+
 # ── Settings ───────────────────────────────────────────────────────────
 
 class SettingUpdate(BaseModel):
@@ -0,0 +1,174 @@
+"""
+Parallel processing of one long video.
+The video is split into frame ranges that are tracked in separate worker
+processes; tracks cut by a range boundary are stitched back together
+before OCR, which runs once over the stitched tracks.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Optional
+
+from config import VIDEO_CHUNK_WORKERS, SAMPLE_FPS, TRACK_MAX_MISSED, TRACK_MATCHING
+from services.detector import (
+    VideoOptions, get_plate_model, process_video, iou_matrix, assign_matches, finalize_tracks,
+)
+from services.frames import probe_video
+
+
+_progress_queue = None  # set in chunk workers when the caller wants progress
+
+
+def _init_chunk_worker(progress_queue=None):
+    """Load the detector, and exit once the process that started the pool is gone.
+
+    The pool is started from a job worker, which ``JobExecutor.stop`` may
+    terminate and which may crash; its chunk workers must not outlive it.
+    """
+    global _progress_queue
+    _progress_queue = progress_queue
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), name="chunk-parent", daemon=True).start()
+    get_plate_model()
+
+
+def _exit_with_parent(parent_pid: int):
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(1)
+
+
+def _track_chunk(
+    video_path: str, start_frame: int, end_frame: int, skip_frames: int, chunk: int = 0,
+) -> tuple[list[dict], dict]:
+    """Track one frame range; return its finished tracks (no OCR) and frame counters.
+
+    The frames of the range done so far are put on the worker's progress
+    queue as ``(chunk, frames)`` while it is tracked.
+    """
+    tracks: list[dict] = []
+    stats: dict = {}
+    options = VideoOptions(
+        skip_frames=skip_frames, sample_fps=None, checkpoint_interval=0, start_frame=start_frame, end_frame=end_frame,
+    )
+
+    def progress_cb(frame_idx: int, _total: int):
+        _progress_queue.put((chunk, frame_idx + 1 - start_frame))
+
+    process_video(
+        video_path, "", options,
+        progress_callback=progress_cb if _progress_queue is not None else None,
+        track_callback=tracks.extend,
+        stats=stats,
+    )
+    return tracks, stats
+
+
+def chunk_bounds(total_frames: int, chunks: int, stride: int) -> list[tuple[int, int]]:
+    """Split [0, total_frames) into ``chunks`` ranges starting on sampled frames."""
+    size = -(-total_frames // max(1, chunks))
+    size = max(stride, -(-size // stride) * stride)
+    return [(start, min(start + size, total_frames)) for start in range(0, total_frames, size)]
+
+
+def stitch_tracks(
+    chunk_tracks: list[list[dict]],
+    bounds: list[tuple[int, int]],
+    window: int,
+    iou_threshold: float = 0.3,
+    matching: str = TRACK_MATCHING,
+) -> list[dict]:
+    """Join tracks that continue across chunk boundaries.
+
+    A track ending within ``window`` frames before a boundary is matched by
+    IoU of its last box against the first box of tracks starting within
+    ``window`` frames after it. Joined tracks keep the higher-scoring best
+    detection and the later end.
+    """
+    stitched = list(chunk_tracks[0]) if chunk_tracks else []
+    for tracks, (seam, _) in zip(chunk_tracks[1:], bounds[1:]):
+        tails = [t for t in stitched if t["last_frame"] >= seam - window]
+        heads = [t for t in tracks if t["first_frame"] < seam + window]
+        merged = set()
+        if tails and heads:
+            scores = iou_matrix([t["last_box"] for t in tails], [h["first_box"] for h in heads])
+            for i, j in assign_matches(scores, iou_threshold, matching):
+                tail, head = tails[i], heads[j]
+                if head["det"]["score"] > tail["det"]["score"]:
+                    tail["det"] = head["det"]
+                tail["last_frame"] = head["last_frame"]
+                tail["last_box"] = head["last_box"]
+                merged.add(id(head))
+        stitched.extend(t for t in tracks if id(t) not in merged)
+    return stitched
+
+
+def process_video_chunked(
+    video_path: str,
+    video_name: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    skip_frames: int = 5,
+    detection_callback: Optional[Callable[[dict], None]] = None,
+    workers: int = VIDEO_CHUNK_WORKERS,
+    sample_fps: Optional[float] = SAMPLE_FPS or None,
+    stats: Optional[dict] = None,
+) -> list[dict]:
+    """Same results as ``process_video``, with tracking spread over ``workers`` processes.
+
+    Results only become available once every chunk is tracked, so plates
+    reach ``detection_callback`` at the end rather than while decoding;
+    progress is reported as the chunks are tracked.
+    """
+    total_frames, fps = probe_video(video_path)
+    stride = max(1, round(fps / sample_fps)) if sample_fps else skip_frames
+    bounds = chunk_bounds(total_frames, workers, stride)
+
+    chunk_tracks: list[list[dict]] = [[] for _ in bounds]
+    if stats is None:
+        stats = {}
+    stats.update(sampled_frames=0, inferred_frames=0, static_frames=0)
+    done_frames = [0] * len(bounds)
+    ctx = multiprocessing.get_context("spawn")
+    progress_queue = ctx.Queue() if progress_callback else None
+    with ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        mp_context=ctx,
+        initializer=_init_chunk_worker,
+        initargs=(progress_queue,),
+    ) as pool:
+        futures = {
+            pool.submit(_track_chunk, video_path, start, end, stride, k): k
+            for k, (start, end) in enumerate(bounds)
+        }
+        running = set(futures)
+        while running:
+            finished, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                k = futures[future]
+                chunk_tracks[k], chunk_stats = future.result()
+                for key, value in chunk_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+                done_frames[k] = bounds[k][1] - bounds[k][0]
+            if progress_queue is None:
+                continue
+            while True:
+                try:
+                    k, frames = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+                done_frames[k] = max(done_frames[k], frames)
+            if total_frames > 0:
+                progress_callback(sum(done_frames), total_frames)
+
+    window = (TRACK_MAX_MISSED + 1) * stride
+    stitched = stitch_tracks(chunk_tracks, bounds, window)
+    stitched.sort(key=lambda t: t["first_frame"])
+
+    saved_plates = finalize_tracks([(tid, t["det"]) for tid, t in enumerate(stitched)], fps, video_name)
+    if detection_callback:
+        for plate in saved_plates:
+            detection_callback(plate)
+    return saved_plates
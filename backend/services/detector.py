@@ -6,11 +6,20 @@ Ported from plate_tracker.py — the core YOLO + OCR pipeline.
 import cv2
 import numpy as np
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Callable, Optional
+from scipy.optimize import linear_sum_assignment
 from ultralytics import YOLO
 
-from config import PLATE_MODEL_PATH, OCR_MODEL_PATH, PLATES_DIR, CARS_DIR
+from config import (
+    PLATE_MODEL_PATH, OCR_MODEL_PATH, PLATES_DIR, CARS_DIR,
+    PLATE_BATCH_SIZE, OCR_BATCH_SIZE, FRAME_QUEUE_SIZE,
+    SAMPLE_FPS, ADAPTIVE_SAMPLING, ADAPTIVE_IDLE_FPS, MOTION_GATE, CHECKPOINT_INTERVAL,
+    TRACK_MAX_MISSED, TRACK_MAX_AGE, TRACK_MAX_LIVE, TRACK_MATCHING, TRACK_MOTION,
+)
+from services.frames import FrameReader, MotionGate
+from services.inference import load_model
 
 # ── Lazy-loaded model singletons ───────────────────────────────────────
 _plate_model: Optional[YOLO] = None
@@ -20,14 +29,14 @@ _ocr_model: Optional[YOLO] = None
 def get_plate_model() -> YOLO:
     global _plate_model
     if _plate_model is None:
-        _plate_model = YOLO(PLATE_MODEL_PATH)
+        _plate_model = load_model(PLATE_MODEL_PATH)
     return _plate_model
 
 
 def get_ocr_model() -> YOLO:
     global _ocr_model
     if _ocr_model is None:
-        _ocr_model = YOLO(OCR_MODEL_PATH)
+        _ocr_model = load_model(OCR_MODEL_PATH)
     return _ocr_model
 
 
@@ -99,63 +108,212 @@ def iou(box1: list, box2: list) -> float:
     return inter / union if union > 0 else 0
 
 
+def iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy box arrays → (N, M)."""
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def assign_matches(scores: np.ndarray, iou_threshold: float, matching: str = "greedy") -> list[tuple[int, int]]:
+    """Pick (row, col) pairs from an IoU matrix, each with IoU >= threshold.
+
+    ``greedy`` takes the highest IoU first; ``hungarian`` solves the optimal
+    assignment.
+    """
+    if matching == "hungarian":
+        cost = np.where(scores >= iou_threshold, 1.0 - scores, 1e6)
+        rows, cols = linear_sum_assignment(cost)
+        return [
+            (int(i), int(j)) for i, j in zip(rows, cols)
+            if scores[i, j] >= iou_threshold
+        ]
+
+    rows, cols = np.nonzero(scores >= iou_threshold)
+    order = np.argsort(-scores[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if i in used_rows or j in used_cols:
+            continue
+        used_rows.add(i)
+        used_cols.add(j)
+        pairs.append((i, j))
+    return pairs
+
+
+class BoxKalman:
+    """Constant-velocity Kalman filter over a box centre, with fixed size.
+
+    State is ``[cx, cy, w, h, vx, vy]``; one step is one tracker update,
+    i.e. one sampled frame.
+    """
+
+    def __init__(self, box: list):
+        x1, y1, x2, y2 = box
+        self.x = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, 0.0, 0.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0])
+        self.F = np.eye(6)
+        self.F[0, 4] = self.F[1, 5] = 1.0
+        self.H = np.eye(4, 6)
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 10.0, 10.0])
+        self.R = np.diag([4.0, 4.0, 10.0, 10.0])
+
+    def box(self) -> list:
+        cx, cy, w, h = self.x[:4]
+        return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+
+    def predict(self) -> list:
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.box()
+
+    def update(self, box: list):
+        x1, y1, x2, y2 = box
+        z = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+
 class PlateTracker:
-    def __init__(self, iou_threshold: float = 0.3):
+    """IoU tracker.
+
+    Tracks are associated with detections through one IoU matrix per
+    update, either greedily (highest IoU first) or with an optimal
+    assignment when ``matching="hungarian"``. With ``motion=True`` each
+    track carries a ``BoxKalman`` and is matched on its predicted box, which
+    keeps fast vehicles on the same ID under sparse frame sampling.
+
+    Live state is bounded by three optional limits. A track is finished
+    when it goes unmatched for more than ``max_missed`` consecutive updates,
+    when it missed an update after living for more than ``max_age``
+    updates, or when more than ``max_tracks`` tracks are live (the
+    most-missed, then oldest, go first). A track that is still matching is
+    never cut by age, so a plate in view does not open a second track.
+    Finished tracks leave the candidate set and their IDs are handed out
+    once by ``pop_finished``.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_missed: Optional[int] = None,
+        matching: str = "greedy",
+        max_age: Optional[int] = None,
+        max_tracks: Optional[int] = None,
+        motion: bool = False,
+    ):
+        if matching not in ("greedy", "hungarian"):
+            raise ValueError(f"Unknown matching mode: {matching}")
         self.tracks: dict = {}
         self.next_id: int = 0
         self.iou_threshold = iou_threshold
+        self.matching = matching
+        self.max_missed = max_missed
+        self.max_age = max_age
+        self.max_tracks = max_tracks
+        self.motion = motion
+        self.finished: list[int] = []
+
+    def _new_track(self, det: dict) -> int:
+        tid = self.next_id
+        self.next_id += 1
+        self.tracks[tid] = {"box": det["box"], "best_conf": det["score"], "missed": 0, "age": 0}
+        if self.motion:
+            self.tracks[tid]["kf"] = BoxKalman(det["box"])
+        return tid
+
+    def _finish(self, tid: int):
+        del self.tracks[tid]
+        self.finished.append(tid)
 
     def update(self, detections: list[dict]) -> list[tuple]:
         if not self.tracks:
-            results = []
-            for det in detections:
-                tid = self.next_id
-                self.next_id += 1
-                self.tracks[tid] = {"box": det["box"], "best_conf": det["score"]}
-                results.append((tid, det, True))
+            results = [(self._new_track(det), det, True) for det in detections]
+            self._enforce_cap()
             return results
 
         track_ids = list(self.tracks.keys())
         matched_tracks, matched_dets = set(), set()
         results = []
 
-        pairs = []
-        for i, tid in enumerate(track_ids):
-            for j, det in enumerate(detections):
-                score = iou(self.tracks[tid]["box"], det["box"])
-                pairs.append((score, i, j))
-        pairs.sort(reverse=True)
+        if self.motion:
+            predicted = {tid: self.tracks[tid]["kf"].predict() for tid in track_ids}
+        else:
+            predicted = {tid: self.tracks[tid]["box"] for tid in track_ids}
+
+        if detections:
+            scores = iou_matrix(
+                [predicted[tid] for tid in track_ids],
+                [det["box"] for det in detections],
+            )
+            pairs = assign_matches(scores, self.iou_threshold, self.matching)
+        else:
+            pairs = []
 
-        for score, i, j in pairs:
-            if score < self.iou_threshold:
-                break
+        for i, j in pairs:
             tid = track_ids[i]
-            if tid in matched_tracks or j in matched_dets:
-                continue
             matched_tracks.add(tid)
             matched_dets.add(j)
             is_better = detections[j]["score"] > self.tracks[tid]["best_conf"]
             if is_better:
                 self.tracks[tid]["best_conf"] = detections[j]["score"]
             self.tracks[tid]["box"] = detections[j]["box"]
+            self.tracks[tid]["missed"] = 0
+            if self.motion:
+                self.tracks[tid]["kf"].update(detections[j]["box"])
             results.append((tid, detections[j], is_better))
 
+        for tid in track_ids:
+            track = self.tracks[tid]
+            track["age"] += 1
+            if tid not in matched_tracks:
+                track["missed"] += 1
+            if self.max_missed is not None and track["missed"] > self.max_missed:
+                self._finish(tid)
+            elif self.max_age is not None and track["age"] > self.max_age and track["missed"]:
+                self._finish(tid)
+
         for j, det in enumerate(detections):
             if j not in matched_dets:
-                tid = self.next_id
-                self.next_id += 1
-                self.tracks[tid] = {"box": det["box"], "best_conf": det["score"]}
-                results.append((tid, det, True))
+                results.append((self._new_track(det), det, True))
 
+        self._enforce_cap()
         return results
 
+    def _enforce_cap(self):
+        if self.max_tracks is None or len(self.tracks) <= self.max_tracks:
+            return
+        by_staleness = sorted(self.tracks, key=lambda tid: (-self.tracks[tid]["missed"], tid))
+        for tid in by_staleness[:len(self.tracks) - self.max_tracks]:
+            self._finish(tid)
+
+    def pop_finished(self) -> list[int]:
+        """Return IDs of tracks finished since the last call."""
+        finished, self.finished = self.finished, []
+        return finished
+
+    def finish_all(self) -> list[int]:
+        """Finish every live track, e.g. at the end of a video."""
+        finished = self.pop_finished() + list(self.tracks.keys())
+        self.tracks.clear()
+        return finished
+
 
 # ── OCR ────────────────────────────────────────────────────────────────
 
-def ocr_plate(plate_crop: np.ndarray) -> tuple[str, str, str]:
-    """Run OCR on a plate crop → (english_text, arabic_text, governorate)."""
-    ocr = get_ocr_model()
-    result = ocr.predict(source=plate_crop, conf=0.25, verbose=False)[0]
+def _parse_ocr_result(result) -> tuple[str, str, str]:
+    """Turn one OCR model result into (english_text, arabic_text, governorate)."""
     sorted_boxes = sorted(result.boxes, key=lambda b: b.xyxy[0][0].item())
 
     numbers, letters = [], []
@@ -173,8 +331,65 @@ def ocr_plate(plate_crop: np.ndarray) -> tuple[str, str, str]:
     return english_text, arabic_text, governorate
 
 
+UNKNOWN_PLATE = ("unknown", "غير معروف", "غير معروفة")
+
+
+def ocr_plate(plate_crop: np.ndarray) -> tuple[str, str, str]:
+    """Run OCR on a plate crop → (english_text, arabic_text, governorate)."""
+    ocr = get_ocr_model()
+    result = ocr.predict(source=plate_crop, conf=0.25, verbose=False)[0]
+    return _parse_ocr_result(result)
+
+
+def ocr_plates_batch(plate_crops: list[np.ndarray]) -> list[tuple[str, str, str]]:
+    """Run OCR on many plate crops at once, results in input order.
+
+    The crops are letterboxed to the model input size by ultralytics and
+    sent through the OCR model ``OCR_BATCH_SIZE`` at a time.
+    """
+    if not plate_crops:
+        return []
+    ocr = get_ocr_model()
+    texts = []
+    step = max(1, OCR_BATCH_SIZE)
+    for start in range(0, len(plate_crops), step):
+        chunk = plate_crops[start:start + step]
+        results = ocr.predict(source=chunk, conf=0.25, verbose=False)
+        texts.extend(_parse_ocr_result(r) for r in results)
+    return texts
+
+
+def _ocr_or_unknown(plate_crops: list[np.ndarray]) -> list[tuple[str, str, str]]:
+    """``ocr_plates_batch`` that reads every crop as unknown when OCR fails, dropping the plates, not the job."""
+    try:
+        return ocr_plates_batch(plate_crops)
+    except Exception:
+        return [UNKNOWN_PLATE] * len(plate_crops)
+
+
+def _is_read(english_text: str) -> bool:
+    return bool(english_text.strip()) and english_text.strip() != UNKNOWN_PLATE[0]
+
+
 # ── Save crops ─────────────────────────────────────────────────────────
 
+CAR_PAD = 300
+
+
+def crop_car_region(frame: np.ndarray, box: list[int]) -> tuple[np.ndarray, list[int]]:
+    """Cut the padded car region around a plate box.
+
+    Returns the region and the plate box in region coordinates. Passing both
+    to ``save_crops`` writes the same files as passing the full frame.
+    """
+    x1, y1, x2, y2 = box
+    h, w = frame.shape[:2]
+    cx1, cy1 = max(0, x1 - CAR_PAD), max(0, y1 - CAR_PAD)
+    cx2, cy2 = min(w, x2 + CAR_PAD), min(h, y2 + CAR_PAD)
+    region = frame[cy1:cy2, cx1:cx2]
+    return region, [x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1]
+
+
 def save_crops(frame: np.ndarray, box: list[int]) -> tuple[str, str]:
     """Save plate crop and car crop, return relative paths."""
     x1, y1, x2, y2 = box
@@ -187,11 +402,7 @@ def save_crops(frame: np.ndarray, box: list[int]) -> tuple[str, str]:
     cv2.imwrite(str(PLATES_DIR / plate_filename), cv2.cvtColor(plate_crop, cv2.COLOR_RGB2BGR))
 
     # Car crop (wider region around plate)
-    pad = 100
-    h, w = frame.shape[:2]
-    cx1, cy1 = max(0, x1 - pad * 3), max(0, y1 - pad * 3)
-    cx2, cy2 = min(w, x2 + pad * 3), min(h, y2 + pad * 3)
-    car_crop = frame[cy1:cy2, cx1:cx2]
+    car_crop, _ = crop_car_region(frame, box)
     car_filename = f"car_{uid}.jpg"
     if len(car_crop.shape) == 3 and car_crop.shape[2] == 3:
         cv2.imwrite(str(CARS_DIR / car_filename), cv2.cvtColor(car_crop, cv2.COLOR_RGB2BGR))
@@ -201,15 +412,141 @@ def save_crops(frame: np.ndarray, box: list[int]) -> tuple[str, str]:
     return f"plates/{plate_filename}", f"cars/{car_filename}"
 
 
+# ── Results ────────────────────────────────────────────────────────────
+
+def plate_result(det: dict, texts: tuple[str, str, str], fps: float, source_name: str, frame: np.ndarray) -> dict:
+    """Save the crops of a read plate; return its result for ``store_detections``."""
+    english_text, arabic_text, governorate = texts
+    plate_path, car_path = save_crops(frame, det["box"])
+    return {
+        "plate_number": english_text,
+        "plate_number_arabic": arabic_text,
+        "governorate": governorate,
+        "confidence": round(det["score"], 4),
+        "frame_number": det["frame_idx"],
+        "timestamp_in_video": datetime.utcfromtimestamp(det["frame_idx"] / fps).strftime("%M:%S"),
+        "source_file": source_name,
+        "plate_image_path": plate_path,
+        "car_image_path": car_path,
+    }
+
+
 # ── Process video ──────────────────────────────────────────────────────
 
+def finalize_tracks(finished: list[tuple[int, dict]], fps: float, video_name: str) -> list[dict]:
+    """OCR and save the best detection of each finished track."""
+    return finalize_track_groups([(finished, fps, video_name)])[0]
+
+
+def finalize_track_groups(
+    groups: list[tuple[list[tuple[int, dict]], float, str]], strict: bool = False,
+) -> list[list[dict]]:
+    """``finalize_tracks`` over several ``(finished, fps, source_name)`` groups at once.
+
+    The plate crops of every group go through one batched OCR pass, e.g.
+    tracks that finished on several camera streams in the same step.
+    Returns the saved plates of each group, in group order. With
+    ``strict`` an OCR error is raised rather than dropping the plates; the
+    tracks are left intact, so they can be finalised again.
+    """
+    candidates = []
+    for g, (finished, fps, video_name) in enumerate(groups):
+        for track_id, det in finished:
+            x1, y1, x2, y2 = det["region_box"]
+            plate_crop = det["region"][y1:y2, x1:x2]
+            if plate_crop.size == 0:
+                continue
+            candidates.append((g, track_id, det, cv2.cvtColor(plate_crop, cv2.COLOR_BGR2RGB)))
+
+    crops = [crop for *_, crop in candidates]
+    ocr_results = ocr_plates_batch(crops) if strict else _ocr_or_unknown(crops)
+
+    saved: list[list[dict]] = [[] for _ in groups]
+    for (g, track_id, det, _), texts in zip(candidates, ocr_results):
+        _, fps, video_name = groups[g]
+        if not _is_read(texts[0]):
+            continue
+        # The crops are cut from the car region, so they take the box in its coordinates
+        plate = plate_result({**det, "box": det["region_box"]}, texts, fps, video_name, det["region"])
+        saved[g].append({"track_id": track_id, **plate})
+
+    return saved
+
+
+def make_tracker(max_missed: int = TRACK_MAX_MISSED) -> PlateTracker:
+    """A ``PlateTracker`` configured from the TRACK_* settings."""
+    return PlateTracker(
+        iou_threshold=0.3,
+        max_missed=max_missed,
+        matching=TRACK_MATCHING,
+        max_age=TRACK_MAX_AGE or None,
+        max_tracks=TRACK_MAX_LIVE or None,
+        motion=TRACK_MOTION,
+    )
+
+
+def plate_detections(results, frame_idx: int) -> list[dict]:
+    """Turn one plate-model result into tracker detections."""
+    detections = []
+    for box_data in results.boxes.data.tolist():
+        x1, y1, x2, y2, score, cls = box_data
+        detections.append({
+            "box": [int(x1), int(y1), int(x2), int(y2)],
+            "score": score,
+            "frame_idx": frame_idx,
+        })
+    return detections
+
+
+def update_tracks(tracker: PlateTracker, best_detections: dict, frame: np.ndarray, detections: list[dict]) -> list[tuple]:
+    """Feed one frame's detections to ``tracker`` and keep each track's best detection.
+
+    Only the car region of a best detection is kept, so the frame itself
+    can be freed. Returns the tracker's ``(track_id, det, is_better)`` list.
+    """
+    tracked = tracker.update(detections)
+    for track_id, det, is_new_or_better in tracked:
+        if is_new_or_better:
+            region, region_box = crop_car_region(frame, det["box"])
+            det["region"] = region.copy()
+            det["region_box"] = region_box
+            best_detections[track_id] = det
+    return tracked
+
+
+@dataclass
+class VideoOptions:
+    """How ``process_video`` samples a video, and which part of it it reads."""
+
+    skip_frames: int = 5
+    sample_fps: Optional[float] = SAMPLE_FPS or None  # replaces skip_frames when set
+    adaptive: bool = ADAPTIVE_SAMPLING  # sample at ADAPTIVE_IDLE_FPS while nothing is seen
+    motion_gate: bool = MOTION_GATE  # skip detection on frames where the scene is static
+    batch_size: int = PLATE_BATCH_SIZE
+    max_missed: int = TRACK_MAX_MISSED
+    checkpoint_interval: int = CHECKPOINT_INTERVAL  # sampled frames between checkpoints, 0 = none
+    start_frame: int = 0
+    end_frame: Optional[int] = None
+
+
 def process_video(
     video_path: str,
     video_name: str,
+    options: Optional[VideoOptions] = None,
     progress_callback: Optional[Callable[[int, int], None]] = None,
-    skip_frames: int = 5,
+    detection_callback: Optional[Callable[[dict], None]] = None,
+    track_callback: Optional[Callable[[list[dict]], None]] = None,
+    checkpoint_callback: Optional[Callable[[dict], None]] = None,
+    resume: Optional[dict] = None,
+    stats: Optional[dict] = None,
 ) -> list[dict]:
-    """Full video processing pipeline with tracking and OCR."""
+    """Full video processing pipeline with tracking and OCR.
+
+    Finished tracks are OCR'd and passed to ``detection_callback`` while
+    decoding continues, or handed un-OCR'd to ``track_callback``. The
+    pipeline state given to ``checkpoint_callback`` continues the run when
+    passed back as ``resume``.
+    """
     plate_model = get_plate_model()
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -217,78 +554,107 @@ def process_video(
 
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-    tracker = PlateTracker(iou_threshold=0.3)
-    best_detections: dict = {}
-
-    frame_idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if frame_idx % skip_frames != 0:
-            frame_idx += 1
-            continue
-
-        results = plate_model(frame, verbose=False)[0]
-        detections = []
-        for box_data in results.boxes.data.tolist():
-            x1, y1, x2, y2, score, cls = box_data
-            detections.append({
-                "box": [int(x1), int(y1), int(x2), int(y2)],
-                "score": score,
-                "frame": frame.copy(),
-                "frame_idx": frame_idx,
-            })
-
-        if detections:
-            tracked = tracker.update(detections)
-            for track_id, det, is_new_or_better in tracked:
-                if is_new_or_better:
-                    best_detections[track_id] = det
-
-        if progress_callback and total_frames > 0:
-            progress_callback(frame_idx, total_frames)
-
-        frame_idx += 1
-
-    cap.release()
-
-    # OCR on best detections
-    saved_plates = []
-    for track_id, det in best_detections.items():
-        frame = det["frame"]
-        x1, y1, x2, y2 = det["box"]
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        plate_crop = frame_rgb[y1:y2, x1:x2]
-
-        if plate_crop.size == 0:
-            continue
-
-        try:
-            english_text, arabic_text, governorate = ocr_plate(plate_crop)
-        except Exception:
-            english_text, arabic_text, governorate = "unknown", "غير معروف", "غير معروفة"
+    opts = options or VideoOptions()
+    if stats is None:
+        stats = {}
+    stats.update(sampled_frames=0, inferred_frames=0, static_frames=0)
+    if resume is not None:
+        tracker = resume["tracker"]
+        best_detections = resume["best_detections"]
+        stats.update(resume["stats"])
+        start_frame = resume.get("next_frame", resume["frame_idx"] + 1)
+    else:
+        tracker = make_tracker(opts.max_missed)
+        best_detections = {}
+        start_frame = opts.start_frame
+    saved_plates: list[dict] = []
+    batch: list[tuple[int, np.ndarray]] = []
+    gate = MotionGate() if opts.motion_gate else None
+    spans: dict = {}
+    last_checkpoint = stats["sampled_frames"]
+
+    def maybe_checkpoint(frame_idx: int):
+        nonlocal last_checkpoint
+        if not checkpoint_callback or opts.checkpoint_interval <= 0:
+            return
+        if stats["sampled_frames"] - last_checkpoint < opts.checkpoint_interval:
+            return
+        last_checkpoint = stats["sampled_frames"]
+        checkpoint_callback({
+            "frame_idx": frame_idx,
+            "next_frame": reader.next_frame,
+            "tracker": tracker,
+            "best_detections": best_detections,
+            "stats": dict(stats),
+        })
 
-        if not english_text.strip() or english_text.strip() == "unknown":
-            continue
+    def finalize(track_ids: list[int]):
+        finished = [(tid, best_detections.pop(tid)) for tid in track_ids if tid in best_detections]
+        if track_callback:
+            track_callback([{"det": det, **spans.pop(tid)} for tid, det in finished])
+            return
+        for plate in finalize_tracks(finished, fps, video_name):
+            saved_plates.append(plate)
+            if detection_callback:
+                detection_callback(plate)
+
+    def flush_batch():
+        if not batch:
+            return
+        batch_results = plate_model([f for _, f in batch], verbose=False)
+        stats["inferred_frames"] += len(batch)
+        for (idx, frame), results in zip(batch, batch_results):
+            detections = plate_detections(results, idx)
+            reader.mark(bool(detections))
+            tracked = update_tracks(tracker, best_detections, frame, detections)
+            if track_callback:
+                for track_id, det, _ in tracked:
+                    span = spans.setdefault(track_id, {"first_frame": idx, "first_box": det["box"]})
+                    span.update(last_frame=idx, last_box=det["box"])
+            finalize(tracker.pop_finished())
+
+            if progress_callback and total_frames > 0:
+                progress_callback(idx, total_frames)
+        batch.clear()
+
+    stride = max(1, round(fps / opts.sample_fps)) if opts.sample_fps else opts.skip_frames
+    batch_size = opts.batch_size
+    idle_stride = None
+    queue_size = FRAME_QUEUE_SIZE
+    if opts.adaptive:
+        idle_stride = max(stride, round(fps / ADAPTIVE_IDLE_FPS))
+        queue_size = batch_size = 1
+
+    reader = FrameReader(
+        cap, stride,
+        queue_size=queue_size,
+        idle_skip_frames=idle_stride,
+        start_frame=start_frame,
+        end_frame=opts.end_frame,
+    )
+    try:
+        for frame_idx, frame in reader:
+            stats["sampled_frames"] += 1
+            if gate is not None and not gate.changed(frame):
+                # Static scene: nothing new to detect, live tracks keep their state
+                stats["static_frames"] += 1
+                reader.mark()
+                if not batch:
+                    if progress_callback and total_frames > 0:
+                        progress_callback(frame_idx, total_frames)
+                    maybe_checkpoint(frame_idx)
+                continue
+            batch.append((frame_idx, frame))
+            if len(batch) >= max(1, batch_size):
+                flush_batch()
+                maybe_checkpoint(frame_idx)
+    finally:
+        reader.close()
+        cap.release()
 
-        plate_path, car_path = save_crops(frame, det["box"])
-        timestamp_sec = det["frame_idx"] / fps
-        timestamp_str = datetime.utcfromtimestamp(timestamp_sec).strftime("%M:%S")
-
-        saved_plates.append({
-            "track_id": track_id,
-            "plate_number": english_text,
-            "plate_number_arabic": arabic_text,
-            "governorate": governorate,
-            "confidence": round(det["score"], 4),
-            "frame_number": det["frame_idx"],
-            "timestamp_in_video": timestamp_str,
-            "source_file": video_name,
-            "plate_image_path": plate_path,
-            "car_image_path": car_path,
-        })
+    flush_batch()
 
+    finalize(tracker.finish_all())
     return saved_plates
 
 
@@ -296,41 +662,61 @@ def process_video(
 
 def process_image(image_path: str, image_name: str) -> list[dict]:
     """Process a single image and return detection results."""
-    plate_model = get_plate_model()
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError("Cannot read image")
+    saved: list[dict] = []
 
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    results = plate_model(image_rgb, verbose=False)[0]
-    saved = []
+    def file_cb(_index: int, results: list[dict], error: Optional[str]):
+        if error is not None:
+            raise ValueError(error)
+        saved.extend(results)
 
-    for box_data in results.boxes.data.tolist():
-        x1, y1, x2, y2, score, cls = [int(v) if i < 4 else v for i, v in enumerate(box_data)]
-        plate_crop = image_rgb[y1:y2, x1:x2]
-        if plate_crop.size == 0:
-            continue
+    process_images([(image_path, image_name)], file_cb)
+    return saved
 
-        try:
-            english_text, arabic_text, governorate = ocr_plate(plate_crop)
-        except Exception:
-            continue
 
-        if not english_text.strip():
+def process_images(
+    images: list[tuple[str, str]],
+    file_callback: Callable[[int, list[dict], Optional[str]], None],
+    batch_size: int = PLATE_BATCH_SIZE,
+):
+    """Process many images with batched detection and batched OCR.
+
+    ``images`` holds ``(image_path, image_name)`` pairs. They go through the
+    plate model ``batch_size`` at a time, and the plates found in each group
+    through one batched OCR call; if OCR fails, the group's plates are
+    dropped as in videos. ``file_callback(index, results, error)`` reports
+    every file once its group is done; ``error`` is set for files that
+    could not be read.
+    """
+    plate_model = get_plate_model()
+    batch_size = max(1, batch_size)
+
+    for start in range(0, len(images), batch_size):
+        group = []
+        for index in range(start, min(start + batch_size, len(images))):
+            image = cv2.imread(images[index][0])
+            if image is None:
+                file_callback(index, [], "Cannot read image")
+                continue
+            group.append((index, image, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)))
+        if not group:
             continue
 
-        plate_path, car_path = save_crops(image, [x1, y1, x2, y2])
-
-        saved.append({
-            "plate_number": english_text,
-            "plate_number_arabic": arabic_text,
-            "governorate": governorate,
-            "confidence": round(score, 4),
-            "frame_number": 0,
-            "timestamp_in_video": "00:00",
-            "source_file": image_name,
-            "plate_image_path": plate_path,
-            "car_image_path": car_path,
-        })
-
-    return saved
+        candidates = []
+        for (index, _, image_rgb), results in zip(group, plate_model([g[2] for g in group], verbose=False)):
+            for det in plate_detections(results, 0):
+                x1, y1, x2, y2 = det["box"]
+                plate_crop = image_rgb[y1:y2, x1:x2]
+                if plate_crop.size == 0:
+                    continue
+                candidates.append((index, det, plate_crop))
+
+        ocr_results = _ocr_or_unknown([crop for *_, crop in candidates])
+
+        saved: dict[int, list[dict]] = {index: [] for index, _, _ in group}
+        originals = {index: image for index, image, _ in group}
+        for (index, det, _), texts in zip(candidates, ocr_results):
+            if _is_read(texts[0]):
+                saved[index].append(plate_result(det, texts, 1.0, images[index][1], originals[index]))
+
+        for index, results in saved.items():
+            file_callback(index, results, None)
@@ -0,0 +1,275 @@
+"""
+Frame sources for the video pipeline.
+Decoding runs ahead of inference on a background thread, and static
+frames can be gated out before they reach the detector.
+"""
+
+import queue
+import threading
+import time
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+from config import FRAME_QUEUE_SIZE, SEEK_MIN_STRIDE, MOTION_THRESHOLD, MOTION_PIXEL_DELTA
+
+_END = object()
+
+
+def probe_video(video_path: str) -> tuple[int, float]:
+    """Return (frame_count, fps) of a video file."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Cannot open video file")
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 25.0
+    finally:
+        cap.release()
+
+
+class FrameReader:
+    """Decode-ahead reader over a ``cv2.VideoCapture``.
+
+    A producer thread walks the stream and pushes ``(frame_idx, frame)`` for
+    sampled frames into a bounded queue; iterating the reader yields those
+    pairs in order. Frames between samples are skipped with ``grab()``, or,
+    for strides of at least ``seek_min_stride`` frames, by seeking, which
+    lets the decoder jump from keyframe to keyframe instead of decoding
+    every frame in between.
+
+    The stride is ``skip_frames``. With ``idle_skip_frames`` set the reader
+    is adaptive: it uses ``idle_skip_frames`` until ``mark(True)`` reports
+    that the last sample had detections, then ``skip_frames`` until
+    ``mark(False)``. The producer then waits for the ``mark`` of each
+    sample before it picks the next one, so the consumer must mark every
+    sample it takes; ``mark()`` keeps the current stride.
+
+    ``start_frame`` skips the beginning of the stream, e.g. to resume a job
+    at the ``next_frame`` of the frame last handed out, which keeps the
+    sampled frames the same; reading stops before ``end_frame`` when it is
+    set. With ``pace_fps`` frames are released no faster than that many
+    per second of video, so a file can stand in for a live stream.
+
+    With ``keep_latest`` the producer never waits for the consumer: when
+    the queue is full the oldest queued frame is dropped to make room, so
+    a consumer that falls behind gets fresh frames rather than a growing
+    backlog. Dropped frames are counted in ``dropped``, and
+    ``captured_at`` holds the ``time.monotonic()`` at which the frame last
+    handed out was read.
+
+    Besides iterating, a consumer serving several readers can ``poll`` for
+    a frame without blocking.
+    """
+
+    def __init__(
+        self,
+        cap: cv2.VideoCapture,
+        skip_frames: int = 1,
+        queue_size: int = FRAME_QUEUE_SIZE,
+        idle_skip_frames: Optional[int] = None,
+        seek_min_stride: int = SEEK_MIN_STRIDE,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        pace_fps: Optional[float] = None,
+        keep_latest: bool = False,
+    ):
+        self.cap = cap
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.skip_frames = max(1, skip_frames)
+        self.idle_skip_frames = max(1, idle_skip_frames) if idle_skip_frames else None
+        self.seek_min_stride = max(2, seek_min_stride)
+        self.pace_fps = pace_fps
+        self.keep_latest = keep_latest
+        self.ended = False
+        self.dropped = 0
+        self.captured_at = 0.0
+        self.next_frame = start_frame
+        self._drop_lock = threading.Lock()
+        self._active = False
+        self._last_idx = start_frame
+        self._marked = threading.Event()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def mark(self, had_detections: Optional[bool] = None):
+        """Report whether the last consumed sample had detections (None: not run)."""
+        if had_detections is not None:
+            self._active = had_detections
+        if self.idle_skip_frames is not None:
+            self.next_frame = self._next_target(self._last_idx)
+            self._marked.set()
+
+    def _stride(self) -> int:
+        if self.idle_skip_frames is None or self._active:
+            return self.skip_frames
+        return self.idle_skip_frames
+
+    def _next_target(self, frame_idx: int) -> int:
+        target = frame_idx + self._stride()
+        return min(target, self.end_frame) if self.end_frame is not None else target
+
+    def _skip_to(self, frame_idx: int, target: int) -> int:
+        """Advance from ``frame_idx`` to ``target`` without decoding; return the new index."""
+        if target - frame_idx >= self.seek_min_stride and self.cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            pos = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+            return pos if pos > frame_idx else target
+        while frame_idx < target:
+            if not self.cap.grab():
+                return -1
+            frame_idx += 1
+        return frame_idx
+
+    def _count_dropped(self):
+        with self._drop_lock:
+            self.dropped += 1
+
+    def _put(self, item) -> bool:
+        if self.keep_latest and item is not _END:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._count_dropped()
+                    except queue.Empty:
+                        pass
+            return False
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        frame_idx = 0
+        started = time.monotonic()
+        try:
+            if self.start_frame > 0:
+                frame_idx = self._skip_to(0, self.start_frame)
+            while frame_idx >= 0 and not self._stop.is_set():
+                if self.end_frame is not None and frame_idx >= self.end_frame:
+                    break
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if self.pace_fps:
+                    self._stop.wait(max(0.0, started + (frame_idx - self.start_frame) / self.pace_fps - time.monotonic()))
+                if self.idle_skip_frames is None:
+                    target = self._next_target(frame_idx)
+                    if not self._put((frame_idx, frame, time.monotonic(), target)):
+                        return
+                else:
+                    # Adaptive: the stride after this sample depends on its detections
+                    self._marked.clear()
+                    if not self._put((frame_idx, frame, time.monotonic(), None)):
+                        return
+                    while not self._marked.wait(0.1):
+                        if self._stop.is_set():
+                            return
+                    target = self.next_frame
+                frame_idx = self._skip_to(frame_idx + 1, target)
+        except BaseException as e:  # surfaced to the consumer
+            self._error = e
+        self._put(_END)
+
+    def __iter__(self) -> Iterator[tuple[int, np.ndarray]]:
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield self._hand_out(item)
+
+    def poll(self, latest: bool = False) -> Optional[tuple[int, np.ndarray]]:
+        """The next sampled ``(frame_idx, frame)`` if one is ready, else None.
+
+        With ``latest`` every queued frame but the newest is dropped and
+        counted in ``dropped``. Once the stream is over ``ended`` is set
+        (and the producer's error, if any, raised).
+        """
+        item = None
+        while not self.ended:
+            try:
+                nxt = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is _END:
+                self.ended = True
+                if self._error is not None:
+                    raise self._error
+                break
+            if item is not None:
+                self._count_dropped()
+            item = nxt
+            if not latest:
+                break
+        if item is None:
+            return None
+        return self._hand_out(item)
+
+    def _hand_out(self, item) -> tuple[int, np.ndarray]:
+        frame_idx, frame, self.captured_at, next_frame = item
+        self._last_idx = frame_idx
+        if next_frame is not None:
+            self.next_frame = next_frame
+        return frame_idx, frame
+
+    def close(self):
+        """Stop the producer thread and drop any frames still queued."""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+
+
+class MotionGate:
+    """Frame-differencing gate in front of the plate detector.
+
+    Each frame is shrunk to ``width`` pixels wide, greyscaled and blurred,
+    then compared with the last frame that passed. It passes when at least
+    ``threshold`` of its pixels changed by more than ``pixel_delta``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = MOTION_THRESHOLD,
+        pixel_delta: int = MOTION_PIXEL_DELTA,
+        width: int = 160,
+    ):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self._reference: Optional[np.ndarray] = None
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """True if the scene moved since the last frame that passed."""
+        small = self._prepare(frame)
+        if self._reference is None or self._reference.shape != small.shape:
+            self._reference = small
+            return True
+        diff = cv2.absdiff(small, self._reference)
+        ratio = np.count_nonzero(diff > self.pixel_delta) / diff.size
+        if ratio < self.threshold:
+            return False
+        self._reference = small
+        return True
@@ -0,0 +1,111 @@
+"""
+Inference backends.
+The YOLO models run from their PyTorch weights, or from an ONNX or
+OpenVINO export of them, which is considerably faster on CPU. An export
+is made once per weights file and backend and cached under
+MODEL_CACHE_DIR, keyed by the weights' hash so that replacing plate.pt or
+best.pt triggers a fresh export. Exports are loaded through ultralytics
+too, so callers get the same results whatever the backend.
+
+Run ``python -m services.inference`` to export ahead of the first job.
+INT8 models ("openvino-int8") are made by ``services.quantize`` instead,
+and only used once they passed its accuracy check.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from ultralytics import YOLO
+
+from config import INFERENCE_BACKEND, MODEL_CACHE_DIR, PLATE_MODEL_PATH, OCR_MODEL_PATH
+
+# backend -> (export format, packages it needs, suffix of the exported model)
+EXPORT_BACKENDS = {
+    "onnx": ("onnx", ("onnx", "onnxruntime"), ".onnx"),
+    "openvino": ("openvino", ("openvino",), "_openvino_model"),
+    "openvino-int8": ("openvino", ("openvino", "nncf"), "_int8_openvino_model"),
+}
+
+
+def weights_digest(weights_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(weights_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def exported_model_path(weights_path: str, backend: str, cache_dir: Path = MODEL_CACHE_DIR) -> Path:
+    """Where the ``backend`` export of ``weights_path`` is cached."""
+    _, _, suffix = EXPORT_BACKENDS[backend]
+    return cache_dir / f"{Path(weights_path).stem}-{weights_digest(weights_path)}{suffix}"
+
+
+def export_model(weights_path: str, backend: str, cache_dir: Path = MODEL_CACHE_DIR, **export_args) -> Path:
+    """Export ``weights_path`` for ``backend`` unless cached; return the export's path.
+
+    The export is staged in a temporary directory and moved into the cache
+    in one step, so workers exporting at the same time never load a
+    half-written model. ``export_args`` go to ultralytics' ``export``.
+    """
+    if backend not in EXPORT_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'")
+    target = exported_model_path(weights_path, backend, cache_dir)
+    if target.exists():
+        return target
+
+    export_format, packages, _ = EXPORT_BACKENDS[backend]
+    missing = [p for p in packages if importlib.util.find_spec(p) is None]
+    if missing:
+        raise RuntimeError(f"Inference backend '{backend}' needs: {', '.join(missing)}")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cache_dir) as staging:
+        staged = Path(staging) / Path(weights_path).name
+        shutil.copyfile(weights_path, staged)
+        exported = YOLO(str(staged)).export(format=export_format, dynamic=True, half=False, **export_args)
+        try:
+            os.replace(exported, target)
+        except OSError:  # another worker finished the same export first
+            if not target.exists():
+                raise
+    return target
+
+
+def quantization_report_path(weights_path: str, cache_dir: Path = MODEL_CACHE_DIR) -> Path:
+    """Where the accuracy check of ``weights_path``'s INT8 model is recorded."""
+    return Path(f"{exported_model_path(weights_path, 'openvino-int8', cache_dir)}.json")
+
+
+def int8_approved(weights_path: str, cache_dir: Path = MODEL_CACHE_DIR) -> bool:
+    """True if an INT8 model of these exact weights exists and passed the accuracy check."""
+    report = quantization_report_path(weights_path, cache_dir)
+    if not report.exists() or not exported_model_path(weights_path, "openvino-int8", cache_dir).exists():
+        return False
+    return bool(json.loads(report.read_text()).get("passed"))
+
+
+def load_model(weights_path: str, backend: str = INFERENCE_BACKEND) -> YOLO:
+    """Load a YOLO model to run on ``backend`` ("torch", "onnx", "openvino" or "openvino-int8")."""
+    if backend == "torch":
+        return YOLO(weights_path)
+    if backend == "openvino-int8":
+        if int8_approved(weights_path):
+            return YOLO(str(exported_model_path(weights_path, backend)), task="detect")
+        # No INT8 model passed the accuracy check: keep FP32 reads
+        backend = "openvino"
+    return YOLO(str(export_model(weights_path, backend)), task="detect")
+
+
+if __name__ == "__main__":
+    if INFERENCE_BACKEND == "torch":
+        raise SystemExit("INFERENCE_BACKEND is 'torch'; nothing to export")
+    if INFERENCE_BACKEND == "openvino-int8":
+        raise SystemExit("INT8 models are made with: python -m services.quantize <sample images>")
+    for weights in (PLATE_MODEL_PATH, OCR_MODEL_PATH):
+        print(export_model(weights, INFERENCE_BACKEND))
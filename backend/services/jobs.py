@@ -0,0 +1,775 @@
+"""
+Background job execution.
+The jobs table is the queue: uploads add `pending` rows and a dispatcher
+thread hands them to a bounded process pool whose workers load the YOLO
+models once. Images go through the same pool, ahead of queued videos; a
+batch upload is one parent job whose images are child jobs processed
+together by the parent's worker. A claimed job holds a lease that its
+worker keeps renewing; jobs whose lease ran out (e.g. after a restart)
+are claimed again.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import and_, create_engine, insert, or_, update
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import (
+    DATABASE_URL, JOB_WORKERS, JOB_POLL_INTERVAL, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, CHECKPOINT_DIR,
+    VIDEO_CHUNK_WORKERS, VIDEO_CHUNK_MIN_SECONDS,
+    PROGRESS_DB_INTERVAL, PROGRESS_DB_STEP, PROGRESS_PUBLISH_INTERVAL, PROGRESS_CHANNEL,
+    DETECTION_BATCH_SIZE,
+)
+from models import Job, Detection, JobStatus, WatchlistEntry, Violation, DetectionStatus
+from services.progress import progress_channel, job_snapshot, detection_snapshot
+
+
+# ── Persisting results ─────────────────────────────────────────────────
+
+def active_watchlist(db: Session) -> dict:
+    return {
+        w.plate_number: w
+        for w in db.query(WatchlistEntry).filter(WatchlistEntry.is_active == True).all()
+    }
+
+
+def store_detections(
+    db: Session,
+    job_id: Optional[str],
+    results: list[dict],
+    watchlist_plates: dict,
+    camera: Optional[str] = None,
+    location: Optional[str] = None,
+) -> list[Detection]:
+    """Store pipeline results as Detections (plus a Violation per watchlist match).
+
+    Plain detections go out as one batched INSERT; watchlist matches are
+    inserted with their IDs returned in order, for their violations. The
+    stored rows come back from INSERT ... RETURNING rather than a read-back,
+    so concurrent writers cannot mix in. Returns the stored detections,
+    plain ones first. Live camera detections have no ``job_id``; they are
+    tagged with ``camera`` and ``location`` instead.
+    """
+    if not results:
+        return []
+
+    rows, hit_rows = [], []
+    for r in results:
+        status = DetectionStatus.normal.value
+        plate = r["plate_number"]
+
+        # Check watchlist
+        if plate in watchlist_plates:
+            status = DetectionStatus.watchlist.value
+            wl = watchlist_plates[plate]
+            wl.match_count += 1
+            wl.last_seen = datetime.utcnow()
+
+        (hit_rows if status == DetectionStatus.watchlist.value else rows).append(dict(
+            plate_number=r["plate_number"],
+            plate_number_arabic=r.get("plate_number_arabic"),
+            governorate=r.get("governorate"),
+            confidence=r.get("confidence"),
+            status=status,
+            frame_number=r.get("frame_number", 0),
+            timestamp_in_video=r.get("timestamp_in_video"),
+            source_file=r.get("source_file"),
+            plate_image_path=r.get("plate_image_path"),
+            car_image_path=r.get("car_image_path"),
+            camera=camera,
+            location=location,
+            job_id=job_id,
+        ))
+    detections = list(db.scalars(insert(Detection).returning(Detection), rows)) if rows else []
+    if not hit_rows:
+        return detections
+
+    # Create violations for watchlist matches
+    hits = db.scalars(insert(Detection).returning(Detection, sort_by_parameter_order=True), hit_rows).all()
+    db.execute(insert(Violation), [
+        dict(
+            detection_id=detection.id,
+            violation_type="watchlist_match",
+            description=f"Watchlist match: {watchlist_plates[detection.plate_number].reason}",
+            plate_number=detection.plate_number,
+            location=detection.location,
+            camera=detection.camera,
+        )
+        for detection in hits
+    ])
+    return detections + list(hits)
+
+
+# ── Worker side ────────────────────────────────────────────────────────
+
+class LeaseLost(RuntimeError):
+    """Another worker has claimed the job since this one started it."""
+
+
+class _Lease:
+    """Renews a claimed job's lease from a heartbeat thread, every third of its length.
+
+    The thread uses its own connection, so the lease holds through steps
+    that report no progress (an unknown frame count, the final OCR pass).
+    ``check`` raises ``LeaseLost`` in the job's thread once the job was
+    claimed by another worker.
+    """
+
+    def __init__(self, engine, job_id: str, worker_id: Optional[str], seconds: int = JOB_LEASE_SECONDS):
+        self.engine = engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.seconds = seconds
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "_Lease":
+        if self.worker_id is not None:
+            self._thread = threading.Thread(target=self._heartbeat_loop, name="job-lease", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        if self._lost.is_set():
+            raise LeaseLost(f"Job {self.job_id} was claimed by another worker")
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.seconds / 3):
+            try:
+                renewed = self._renew()
+            except Exception:
+                continue  # e.g. the database is locked; retried on the next beat
+            if not renewed:
+                self._lost.set()
+                return
+
+    def _renew(self) -> bool:
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(Job)
+                .where(Job.id == self.job_id, Job.worker_id == self.worker_id, Job.status == JobStatus.processing.value)
+                .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=self.seconds))
+            ).rowcount > 0
+
+
+def _discard_partial_results(db: Session, job_id: str, keep_up_to: int = 0):
+    """Drop rows a previous, interrupted attempt stored after detection ID ``keep_up_to``."""
+    detection_ids = [
+        d.id for d in db.query(Detection.id).filter(Detection.job_id == job_id, Detection.id > keep_up_to)
+    ]
+    if detection_ids:
+        db.query(Violation).filter(Violation.detection_id.in_(detection_ids)).delete(synchronize_session=False)
+        db.query(Detection).filter(Detection.id.in_(detection_ids)).delete(synchronize_session=False)
+
+
+# ── Checkpoints ────────────────────────────────────────────────────────
+
+def _save_checkpoint(job_id: str, state: dict) -> str:
+    """Write a pipeline checkpoint atomically and return its path."""
+    path = CHECKPOINT_DIR / f"{job_id}.pkl"
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return str(path)
+
+
+def _load_checkpoint(path: Optional[str]) -> Optional[dict]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _drop_checkpoint(job: Job):
+    if job.checkpoint_path and os.path.exists(job.checkpoint_path):
+        os.remove(job.checkpoint_path)
+    job.checkpoint_path = None
+    job.checkpoint_frame = None
+
+
+# Errors worth another attempt; anything else (an unreadable file, a bad
+# option) fails the same way every time
+_TRANSIENT_ERRORS = (OperationalError, OSError, MemoryError, BrokenProcessPool)
+
+
+def _is_transient(error: BaseException) -> bool:
+    if isinstance(error, FileNotFoundError):
+        return False
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+def _retry_or_fail(job: Job, message: str, retry: bool = True):
+    """Put an interrupted job back in the queue, keeping its checkpoint, or fail it.
+
+    The job fails when ``retry`` is false or it is out of attempts; either
+    way ``message`` is kept as its last error.
+    """
+    job.lease_expires_at = None
+    job.error_message = message
+    if retry and (job.attempts or 0) < JOB_MAX_ATTEMPTS:
+        job.status = JobStatus.pending.value
+    else:
+        job.status = JobStatus.failed.value
+        _drop_checkpoint(job)
+
+
+_progress_queue = None  # set in pool workers, carries events to the API process
+
+
+def _init_worker(progress_queue=None):
+    """Load both models once per worker process."""
+    global _progress_queue
+    _progress_queue = progress_queue
+    from services.detector import get_plate_model, get_ocr_model
+    get_plate_model()
+    get_ocr_model()
+
+
+def _send_event(event: str, job_id: str, data: Optional[dict]):
+    if _progress_queue is not None:
+        _progress_queue.put((event, job_id, data))
+
+
+class _ProgressReporter:
+    """Coalesces progress and detection writes.
+
+    The job row is committed when ``PROGRESS_DB_INTERVAL`` seconds passed or
+    progress moved by ``PROGRESS_DB_STEP`` percent since the last commit.
+    Finalised detections are held until then too (or until
+    ``DETECTION_BATCH_SIZE`` are waiting) and stored in one batch.
+    Snapshots go to the API process's progress channel at most every
+    ``PROGRESS_PUBLISH_INTERVAL`` seconds.
+    """
+
+    def __init__(self, db: Session, job: Job, lease: "_Lease", watchlist_plates: dict):
+        self.db = db
+        self.job = job
+        self.lease = lease
+        self.watchlist_plates = watchlist_plates
+        self._pending: list[dict] = []
+        self._committed_at = time.monotonic()
+        self._committed_progress = job.progress or 0.0
+        self._published_at = 0.0
+
+    def update(self, current: int, total: int, stats: dict):
+        self.lease.check()
+        job = self.job
+        job.processed_frames = current
+        job.total_frames = total
+        job.inferred_frames = stats.get("inferred_frames", 0)
+        job.static_frames = stats.get("static_frames", 0)
+        job.progress = round((current / total) * 100, 1) if total > 0 else 0
+
+        now = time.monotonic()
+        if (
+            now - self._committed_at >= PROGRESS_DB_INTERVAL
+            or job.progress - self._committed_progress >= PROGRESS_DB_STEP
+        ):
+            self.commit()
+        elif now - self._published_at >= PROGRESS_PUBLISH_INTERVAL:
+            self.publish()
+
+    def add_detection(self, r: dict):
+        self._pending.append(r)
+        if len(self._pending) >= DETECTION_BATCH_SIZE:
+            self.commit()
+
+    def flush_detections(self):
+        """Store the waiting detections in one batch and publish them."""
+        if not self._pending:
+            return
+        detections = store_detections(self.db, self.job.id, self._pending, self.watchlist_plates)
+        self._pending = []
+        self.job.detections_count = (self.job.detections_count or 0) + len(detections)
+        for detection in detections:
+            self.publish_detection(detection)
+
+    def commit(self):
+        self.flush_detections()
+        self.lease.check()
+        self.db.commit()
+        self._committed_at = time.monotonic()
+        self._committed_progress = self.job.progress or 0.0
+        self.publish()
+
+    def publish(self):
+        if _progress_queue is None:
+            return
+        _send_event("progress", self.job.id, job_snapshot(self.job))
+        self._published_at = time.monotonic()
+
+    def publish_detection(self, detection: Detection):
+        if _progress_queue is not None:
+            _send_event("detection", self.job.id, detection_snapshot(detection))
+
+
+def _run_job(
+    job_id: str,
+    db_url: str,
+    worker_id: Optional[str],
+    work: Callable[[Session, Job, "_Lease"], None],
+    on_failed: Optional[Callable[[Session, str], None]] = None,
+):
+    """Run ``work(db, job, lease)`` on a claimed job, then mark the job completed.
+
+    ``worker_id`` is the lease owner set when the job was claimed; the lease
+    is renewed by a heartbeat thread while the job runs. If the lease is
+    lost the job is left to its new owner. A transient error (database,
+    I/O) puts the job back in the queue until it is out of attempts; any
+    other error, or running out, fails it, after which
+    ``on_failed(db, message)`` runs.
+    """
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    lease = _Lease(engine, job_id, worker_id).start()
+
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        job.status = JobStatus.processing.value
+        work(db, job, lease)
+
+        job.status = JobStatus.completed.value
+        job.progress = 100.0
+        job.completed_at = datetime.utcnow()
+        job.lease_expires_at = None
+        job.error_message = None
+        lease.check()
+        db.commit()
+        _send_event("progress", job_id, job_snapshot(job))
+
+    except LeaseLost:
+        db.rollback()
+        _send_event("clear", job_id, None)
+    except Exception as e:
+        db.rollback()
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job:
+            _retry_or_fail(job, str(e), retry=_is_transient(e))
+            if job.status == JobStatus.failed.value and on_failed is not None:
+                on_failed(db, str(e))
+            db.commit()
+            _send_event("progress", job_id, job_snapshot(job))
+    finally:
+        lease.stop()
+        db.close()
+        engine.dispose()
+
+
+def run_video_job(job_id: str, db_url: str = DATABASE_URL, worker_id: Optional[str] = None):
+    """Process one queued video job end to end.
+
+    A rerun resumes from the job's last checkpoint when there is one,
+    keeping the detections stored up to it.
+    """
+    from services.detector import process_video
+    from services.chunked import process_video_chunked
+    from services.frames import probe_video
+
+    def work(db: Session, job: Job, lease: _Lease):
+        # A job interrupted earlier resumes from its checkpoint; rows stored after it are redone
+        resume = _load_checkpoint(job.checkpoint_path)
+        _discard_partial_results(db, job_id, keep_up_to=resume["last_detection_id"] if resume else 0)
+        job.detections_count = db.query(Detection).filter(Detection.job_id == job_id).count()
+        db.commit()
+        reporter = _ProgressReporter(db, job, lease, active_watchlist(db))
+
+        stats: dict = {}
+
+        def progress_cb(current: int, total: int):
+            reporter.update(current, total, stats)
+
+        def detection_cb(r: dict):
+            # Tracks are finalised while the video is still decoding
+            reporter.add_detection(r)
+
+        def checkpoint_cb(state: dict):
+            reporter.flush_detections()
+            last = db.query(Detection.id).filter(Detection.job_id == job_id).order_by(Detection.id.desc()).first()
+            state["last_detection_id"] = last.id if last else 0
+            job.checkpoint_path = _save_checkpoint(job_id, state)
+            job.checkpoint_frame = state["frame_idx"]
+            lease.check()
+            db.commit()
+
+        total_frames, fps = probe_video(job.file_path)
+        if resume is None and VIDEO_CHUNK_WORKERS > 1 and total_frames >= VIDEO_CHUNK_MIN_SECONDS * fps:
+            # Long video: track chunks in parallel, no checkpoints
+            process_video_chunked(
+                job.file_path, job.filename,
+                progress_callback=progress_cb,
+                detection_callback=detection_cb,
+                stats=stats,
+            )
+        else:
+            process_video(
+                job.file_path, job.filename,
+                progress_callback=progress_cb,
+                detection_callback=detection_cb,
+                stats=stats,
+                checkpoint_callback=checkpoint_cb,
+                resume=resume,
+            )
+
+        reporter.flush_detections()
+        job.inferred_frames = stats["inferred_frames"]
+        job.static_frames = stats["static_frames"]
+        job.detections_count = db.query(Detection).filter(Detection.job_id == job_id).count()
+        _drop_checkpoint(job)
+
+    _run_job(job_id, db_url, worker_id, work)
+
+
+def run_image_job(job_id: str, db_url: str = DATABASE_URL, worker_id: Optional[str] = None):
+    """Process one queued image job."""
+    from services.detector import process_image
+
+    def work(db: Session, job: Job, lease: _Lease):
+        _discard_partial_results(db, job_id)
+        db.commit()
+        reporter = _ProgressReporter(db, job, lease, active_watchlist(db))
+
+        for r in process_image(job.file_path, job.filename):
+            reporter.add_detection(r)
+        reporter.flush_detections()
+
+    _run_job(job_id, db_url, worker_id, work)
+
+
+def run_batch_job(job_id: str, db_url: str = DATABASE_URL, worker_id: Optional[str] = None):
+    """Process the images of one batch upload.
+
+    Each image is a child job that ends up `completed` (with its own
+    detections) or `failed`; the parent counts processed files as frames.
+    A rerun skips children already completed.
+    """
+    from services.detector import process_images
+
+    def work(db: Session, job: Job, lease: _Lease):
+        children = db.query(Job).filter(Job.parent_id == job_id).order_by(Job.file_path).all()
+        todo = [c for c in children if c.status != JobStatus.completed.value]
+        for child in todo:
+            _discard_partial_results(db, child.id)
+        job.total_frames = len(children)
+        job.processed_frames = len(children) - len(todo)
+        job.detections_count = sum(c.detections_count or 0 for c in children if c.status == JobStatus.completed.value)
+        db.commit()
+        reporter = _ProgressReporter(db, job, lease, active_watchlist(db))
+
+        def file_cb(index: int, results: list[dict], error: Optional[str]):
+            child = todo[index]
+            if error is None:
+                detections = store_detections(db, child.id, results, reporter.watchlist_plates)
+                for detection in detections:
+                    reporter.publish_detection(detection)
+                child.status = JobStatus.completed.value
+                child.progress = 100.0
+                child.detections_count = len(detections)
+                job.detections_count = (job.detections_count or 0) + len(detections)
+            else:
+                child.status = JobStatus.failed.value
+                child.error_message = error
+            child.completed_at = datetime.utcnow()
+            reporter.update((job.processed_frames or 0) + 1, len(children), {})
+
+        process_images([(c.file_path, c.filename) for c in todo], file_cb)
+
+    def fail_children(db: Session, message: str):
+        db.query(Job).filter(
+            Job.parent_id == job_id, Job.status != JobStatus.completed.value,
+        ).update({Job.status: JobStatus.failed.value, Job.error_message: message}, synchronize_session=False)
+
+    _run_job(job_id, db_url, worker_id, work, on_failed=fail_children)
+
+
+_RUNNERS = {"video": run_video_job, "image": run_image_job, "batch": run_batch_job}
+
+
+# ── Dispatcher ─────────────────────────────────────────────────────────
+
+class JobExecutor:
+    """Runs pending jobs from the jobs table on a process pool.
+
+    At most ``workers`` jobs run at once; the rest wait as `pending` rows,
+    so queued work survives an API restart. ``notify()`` wakes the
+    dispatcher after a new job is added, otherwise it polls every
+    ``poll_interval`` seconds.
+
+    Claiming a job stamps it with this executor's ``worker_id`` and a lease
+    of ``JOB_LEASE_SECONDS``. A `processing` job whose lease expired is
+    orphaned and is claimed again, up to ``JOB_MAX_ATTEMPTS`` attempts.
+
+    Pending images are claimed before videos, since a client may be
+    waiting on them (see ``wait``).
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL, db_url: str = DATABASE_URL):
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.db_url = db_url
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._running: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._waiters: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._mp = multiprocessing.get_context("spawn")
+        self._progress_queue = None
+        self._listener: Optional[threading.Thread] = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._session_factory = sessionmaker(bind=create_engine(db_url, connect_args={"check_same_thread": False}))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._fail_unrecoverable()
+        if PROGRESS_CHANNEL:
+            self._progress_queue = self._mp.Queue()
+            self._listener = threading.Thread(target=self._listen_loop, daemon=True)
+            self._listener.start()
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop dispatching and terminate running jobs; they are requeued to resume later."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pool is not None:
+            with self._lock:
+                interrupted = list(self._running)
+            # shutdown() never stops running tasks and the pool's workers are
+            # joined at interpreter exit, so they are terminated here
+            for process in list((self._pool._processes or {}).values()):
+                process.terminate()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._requeue(interrupted)
+        if self._listener is not None:
+            self._progress_queue.put(None)
+            self._listener.join()
+            self._listener = None
+
+    def notify(self):
+        """Wake the dispatcher, e.g. right after a job was queued."""
+        self._wake.set()
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """Wait until the job completed or failed, up to ``timeout`` seconds; return whether it did.
+
+        The status is read again whenever one of this executor's jobs
+        finishes, and every ``poll_interval`` in case another one ran it.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            done = asyncio.Event()
+            with self._lock:
+                self._waiters.setdefault(job_id, []).append((loop, done))
+            try:
+                db = self._session_factory()
+                try:
+                    status = db.query(Job.status).filter(Job.id == job_id).scalar()
+                finally:
+                    db.close()
+                if status in (JobStatus.completed.value, JobStatus.failed.value):
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(done.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(job_id, [])
+                    if (loop, done) in waiters:
+                        waiters.remove((loop, done))
+                    if not waiters:
+                        self._waiters.pop(job_id, None)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._mp,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,),
+        )
+
+    def _listen_loop(self):
+        """Move worker progress and detection events into the in-process progress channel."""
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                return
+            event, job_id, data = item
+            if event == "detection":
+                progress_channel.publish_detection(job_id, data)
+            elif event == "clear":
+                progress_channel.clear(job_id)
+            else:
+                progress_channel.publish(job_id, data)
+
+    def _fail_unrecoverable(self):
+        """Fail jobs stuck in `processing` that can never be resumed."""
+        db = self._session_factory()
+        try:
+            stuck = db.query(Job).filter(
+                Job.status == JobStatus.processing.value,
+                or_(Job.file_path.is_(None), Job.lease_expires_at.is_(None)),
+            )
+            for job in stuck:
+                job.status = JobStatus.failed.value
+                job.error_message = "Interrupted by a server restart"
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim_next(self) -> Optional[tuple[str, str]]:
+        """Claim the next pending or orphaned job, images first; return its ID and file type."""
+        db = self._session_factory()
+        try:
+            now = datetime.utcnow()
+            claimable = or_(
+                Job.status == JobStatus.pending.value,
+                and_(Job.status == JobStatus.processing.value, Job.lease_expires_at < now),
+            )
+            candidates = (
+                db.query(Job)
+                .filter(
+                    claimable, Job.file_type.in_(list(_RUNNERS)), Job.file_path.isnot(None), Job.parent_id.is_(None),
+                )
+                .order_by((Job.file_type == "image").desc(), Job.created_at)
+                .limit(self.workers + len(self._running))
+                .all()
+            )
+            for job in candidates:
+                job_id, file_type = job.id, job.file_type
+                if job_id in self._running:
+                    continue
+                if (job.attempts or 0) >= JOB_MAX_ATTEMPTS:
+                    job.status = JobStatus.failed.value
+                    job.error_message = f"Gave up after {job.attempts} attempts"
+                    job.lease_expires_at = None
+                    _drop_checkpoint(job)
+                    db.commit()
+                    progress_channel.clear(job_id)
+                    continue
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, claimable)
+                    .values(
+                        status=JobStatus.processing.value,
+                        worker_id=self.worker_id,
+                        attempts=Job.attempts + 1,
+                        heartbeat_at=now,
+                        lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return job_id, file_type
+            return None
+        finally:
+            db.close()
+
+    def _release(self, job_id: str, message: str):
+        """Put a job whose worker died back in the queue, or fail it when out of attempts."""
+        db = self._session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None or job.status != JobStatus.processing.value or job.worker_id != self.worker_id:
+                return
+            _retry_or_fail(job, message)
+            db.commit()
+            progress_channel.clear(job_id)
+        finally:
+            db.close()
+
+    def _requeue(self, job_ids: list[str]):
+        """Return jobs interrupted by ``stop`` to `pending`, without counting the attempt."""
+        if not job_ids:
+            return
+        db = self._session_factory()
+        try:
+            db.query(Job).filter(
+                Job.id.in_(job_ids),
+                Job.status == JobStatus.processing.value,
+                Job.worker_id == self.worker_id,
+            ).update(
+                {Job.status: JobStatus.pending.value, Job.lease_expires_at: None, Job.attempts: Job.attempts - 1},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+        for job_id in job_ids:
+            progress_channel.clear(job_id)
+
+    def _on_done(self, job_id: str, future: Future):
+        with self._lock:
+            self._running.pop(job_id, None)
+        exc = None if future.cancelled() or self._stop.is_set() else future.exception()
+        if exc is not None:
+            if isinstance(exc, BrokenProcessPool):
+                self._pool = None
+            self._release(job_id, f"Worker crashed: {exc}")
+        with self._lock:
+            waiters = self._waiters.pop(job_id, [])
+        for loop, done in waiters:
+            try:
+                loop.call_soon_threadsafe(done.set)
+            except RuntimeError:  # waiter's loop already closed
+                pass
+        self._wake.set()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            while len(self._running) < self.workers and not self._stop.is_set():
+                claimed = self._claim_next()
+                if claimed is None:
+                    break
+                job_id, file_type = claimed
+                if self._pool is None:
+                    self._pool = self._new_pool()
+                future = self._pool.submit(_RUNNERS[file_type], job_id, self.db_url, self.worker_id)
+                with self._lock:
+                    self._running[job_id] = future
+                future.add_done_callback(lambda f, jid=job_id: self._on_done(jid, f))
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+job_executor = JobExecutor()
@@ -0,0 +1,88 @@
+"""
+In-memory job progress.
+Job workers publish progress snapshots and finalised detections here, so
+clients polling a running job are answered without a database read and
+subscribers to a job's event stream get updates pushed as they happen.
+"""
+
+import asyncio
+import threading
+from typing import Optional
+
+from models import Detection, Job, JobStatus
+from schemas import DetectionResponse, JobResponse
+
+FINISHED_STATUSES = (JobStatus.completed.value, JobStatus.failed.value)
+
+
+def job_snapshot(job: Job) -> dict:
+    """Serialise a job the way ``GET /api/jobs/{job_id}`` returns it."""
+    return JobResponse.model_validate(job).model_dump()
+
+
+def detection_snapshot(detection: Detection) -> dict:
+    """Serialise a stored detection for the job event stream."""
+    return DetectionResponse.model_validate(detection).model_dump()
+
+
+class ProgressChannel:
+    """Latest snapshot per running job, plus fan-out to event subscribers.
+
+    Only snapshots of `processing` jobs are kept; once a job finished or
+    went back to the queue readers fall back to the database, which holds
+    its current state. Subscribers are asyncio queues
+    that receive ``(event, data)`` pairs; ``publish`` may be called from
+    any thread.
+    """
+
+    def __init__(self):
+        self._latest: dict[str, dict] = {}
+        self._subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, snapshot: dict):
+        with self._lock:
+            if snapshot.get("status") == JobStatus.processing.value:
+                self._latest[job_id] = snapshot
+            else:
+                self._latest.pop(job_id, None)
+        self._fan_out(job_id, "progress", snapshot)
+
+    def clear(self, job_id: str):
+        """Forget a job's snapshot, e.g. when its worker stopped without publishing a final one."""
+        with self._lock:
+            self._latest.pop(job_id, None)
+
+    def publish_detection(self, job_id: str, detection: dict):
+        self._fan_out(job_id, "detection", detection)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Register a queue on the running event loop for ``job_id``'s events."""
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(job_id, []) if s[1] is not queue]
+            if subscribers:
+                self._subscribers[job_id] = subscribers
+            else:
+                self._subscribers.pop(job_id, None)
+
+    def _fan_out(self, job_id: str, event: str, data: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:  # subscriber's loop already closed
+                self.unsubscribe(job_id, queue)
+
+
+progress_channel = ProgressChannel()
@@ -0,0 +1,133 @@
+"""
+INT8 quantisation of the plate detector and the OCR model.
+Both models are calibrated as INT8 OpenVINO models on a sample set of our
+own images: the detector on the images themselves, the OCR model on the
+plate crops the FP32 detector finds in them. Every sample is then read by
+the FP32 and the INT8 pipeline; the INT8 models are only approved for
+INFERENCE_BACKEND=openvino-int8 if they read at least QUANT_MIN_AGREEMENT
+of the FP32 plate strings the same way.
+
+    python -m services.quantize path/to/sample_images
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from config import PLATE_MODEL_PATH, OCR_MODEL_PATH, MODEL_CACHE_DIR, QUANT_MIN_AGREEMENT, ALLOWED_IMAGE_EXT
+from services.detector import _parse_ocr_result
+from services.inference import export_model, exported_model_path, quantization_report_path, weights_digest
+
+
+def sample_images(directory: Path) -> list[Path]:
+    return sorted(p for p in directory.rglob("*") if p.suffix.lower() in ALLOWED_IMAGE_EXT)
+
+
+def plate_crops(plate_model: YOLO, image: np.ndarray) -> list[np.ndarray]:
+    """Plate crops of one BGR image, prepared the way ``process_image`` feeds them to OCR."""
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    results = plate_model(image_rgb, verbose=False)[0]
+    crops = []
+    for x1, y1, x2, y2, *_ in results.boxes.data.tolist():
+        crop = image_rgb[int(y1):int(y2), int(x1):int(x2)]
+        if crop.size:
+            crops.append(crop)
+    return crops
+
+
+def read_plates(plate_model: YOLO, ocr_model: YOLO, image: np.ndarray) -> list[str]:
+    """The plate strings the pipeline reads in one image."""
+    crops = plate_crops(plate_model, image)
+    if not crops:
+        return []
+    results = ocr_model.predict(source=crops, conf=0.25, verbose=False)
+    return [text for text, _, _ in map(_parse_ocr_result, results) if text.strip()]
+
+
+def _calibration_data(directory: Path, images: list[np.ndarray], names: dict) -> str:
+    """Write ``images`` as an images-only dataset; return its YAML for ultralytics."""
+    (directory / "images").mkdir(parents=True)
+    for k, image in enumerate(images):
+        cv2.imwrite(str(directory / "images" / f"{k:05d}.png"), image)
+    data = directory / "data.yaml"
+    data.write_text(json.dumps({"path": str(directory), "train": "images", "val": "images", "names": names}))
+    return str(data)
+
+
+def _quantize(weights_path: str, data: str) -> Path:
+    """Calibrate a fresh INT8 model of ``weights_path`` on the ``data`` dataset."""
+    target = exported_model_path(weights_path, "openvino-int8")
+    shutil.rmtree(target, ignore_errors=True)
+    quantization_report_path(weights_path).unlink(missing_ok=True)
+    return export_model(weights_path, "openvino-int8", int8=True, data=data)
+
+
+def agreement(fp32_reads: list[list[str]], int8_reads: list[list[str]]) -> tuple[float, int]:
+    """Share of FP32 plate reads the INT8 pipeline matched in the same image, and their count."""
+    total = sum(len(reads) for reads in fp32_reads)
+    matched = sum(sum((Counter(a) & Counter(b)).values()) for a, b in zip(fp32_reads, int8_reads))
+    return (matched / total if total else 0.0), total
+
+
+def calibrate(sample_dir: Path, min_agreement: float = QUANT_MIN_AGREEMENT) -> dict:
+    """Quantise both models on ``sample_dir`` and record whether they may be used."""
+    samples = [(path, image) for path in sample_images(sample_dir) if (image := cv2.imread(str(path))) is not None]
+    images = [image for _, image in samples]
+    if not images:
+        raise ValueError(f"No readable images in {sample_dir}")
+
+    plate_fp32, ocr_fp32 = YOLO(PLATE_MODEL_PATH), YOLO(OCR_MODEL_PATH)
+    crops = [crop for image in images for crop in plate_crops(plate_fp32, image)]
+    if not crops:
+        raise ValueError("The FP32 detector found no plates in the samples")
+
+    MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=MODEL_CACHE_DIR) as staging:
+        plate_int8 = _quantize(PLATE_MODEL_PATH, _calibration_data(Path(staging) / "scenes", images, plate_fp32.names))
+        ocr_int8 = _quantize(OCR_MODEL_PATH, _calibration_data(Path(staging) / "plates", crops, ocr_fp32.names))
+
+    fp32_reads = [read_plates(plate_fp32, ocr_fp32, image) for image in images]
+    int8_models = YOLO(str(plate_int8), task="detect"), YOLO(str(ocr_int8), task="detect")
+    int8_reads = [read_plates(*int8_models, image) for image in images]
+    share, total = agreement(fp32_reads, int8_reads)
+
+    report = {
+        "plate_weights": weights_digest(PLATE_MODEL_PATH),
+        "ocr_weights": weights_digest(OCR_MODEL_PATH),
+        "samples": len(images),
+        "calibration_plates": len(crops),
+        "fp32_reads": total,
+        "agreement": round(share, 4),
+        "min_agreement": min_agreement,
+        "passed": total > 0 and share >= min_agreement,
+        "mismatches": [
+            {"image": str(path), "fp32": a, "int8": b}
+            for (path, _), a, b in zip(samples, fp32_reads, int8_reads)
+            if Counter(a) != Counter(b)
+        ][:20],
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    for weights in (PLATE_MODEL_PATH, OCR_MODEL_PATH):
+        quantization_report_path(weights).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantise the plate and OCR models to INT8 and check their reads.")
+    parser.add_argument("samples", type=Path, help="directory of sample images with plates")
+    parser.add_argument("--min-agreement", type=float, default=QUANT_MIN_AGREEMENT)
+    args = parser.parse_args()
+
+    result = calibrate(args.samples, args.min_agreement)
+    verdict = "approved" if result["passed"] else "rejected"
+    print(f"INT8 models {verdict}: {result['agreement']:.1%} of {result['fp32_reads']} FP32 plate reads matched")
+    if not result["passed"]:
+        raise SystemExit(1)
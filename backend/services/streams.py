@@ -0,0 +1,453 @@
+"""
+Live camera streams.
+Active cameras with a stream URL are shared out over STREAM_WORKERS
+long-running processes. Each process holds one copy of the models and a
+scheduler that takes frames round-robin from all of its cameras into
+shared batched detector calls; tracks that finish on any camera are
+OCR'd together and stored as Detections tagged with the camera's name and
+location. A local video file works as a stream URL; it is replayed at
+its own frame rate, from the start each time it ends. Workers report
+per-camera dropped frames and end-to-end latency back to the API process.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import cv2
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import (
+    DATABASE_URL, MOTION_GATE, STREAM_SAMPLE_FPS, STREAM_QUEUE_SIZE, STREAM_RECONNECT_DELAY,
+    STREAM_MONITOR_INTERVAL, STREAM_WORKERS, STREAM_BATCH_SIZE, STREAM_DROP_POLICY, STREAM_METRICS_INTERVAL,
+)
+from models import Camera
+from services.frames import FrameReader, MotionGate
+
+
+class CameraStream:
+    """Connection and tracking state of one camera's stream.
+
+    The stream is opened on a background thread, so a slow or unreachable
+    camera never holds up the others; a stream that cannot be opened or
+    ends is retried after ``STREAM_RECONNECT_DELAY`` seconds. Tracks that
+    finish, including those cut off by a drop, collect in ``finished``
+    until the scheduler OCRs them, and their plates in ``unstored`` until
+    they are committed. ``error`` is set while the scheduler's steps fail.
+    A stream is not reopened once ``close`` was called; a connection that
+    was still being opened then is released.
+
+    With ``keep_latest`` the stream's reader drops stale frames instead of
+    waiting for the scheduler (see ``FrameReader``).
+    """
+
+    def __init__(
+        self,
+        camera_id: int,
+        name: str,
+        location: Optional[str],
+        url: str,
+        sample_fps: float = STREAM_SAMPLE_FPS,
+        keep_latest: bool = True,
+    ):
+        from services.detector import make_tracker
+
+        self.camera_id = camera_id
+        self.name = name
+        self.location = location
+        self.url = url
+        self.sample_fps = sample_fps
+        self.keep_latest = keep_latest
+        self.replay = os.path.isfile(url)
+        self.fps = 25.0
+        self.tracker = make_tracker()
+        self.best_detections: dict = {}
+        self.finished: list[tuple[int, dict]] = []
+        self.unstored: list[dict] = []
+        self.error: Optional[str] = None
+        self.gate = MotionGate() if MOTION_GATE else None
+        self.reader: Optional[FrameReader] = None
+        self._connecting = False
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.closed = False
+        self.sampled_frames = 0
+        self.inferred_frames = 0
+        self._dropped_before = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._latency_max = 0.0
+
+    def _connect(self):
+        cap = cv2.VideoCapture(self.url)
+        with self._lock:
+            if cap.isOpened() and not self.closed:
+                self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+                stride = max(1, round(self.fps / self.sample_fps)) if self.sample_fps else 1
+                # Live streams cannot seek, so skipped frames are always grabbed
+                self.reader = FrameReader(
+                    cap, stride,
+                    queue_size=STREAM_QUEUE_SIZE,
+                    seek_min_stride=stride + 1,
+                    pace_fps=self.fps if self.replay else None,
+                    keep_latest=self.keep_latest,
+                )
+            else:
+                cap.release()
+                self._retry_at = time.monotonic() + STREAM_RECONNECT_DELAY
+            self._connecting = False
+
+    def poll(self, latest: bool) -> Optional[tuple[int, np.ndarray, float]]:
+        """The next ``(frame_idx, frame, captured_at)`` to detect on, if one is ready.
+
+        See ``FrameReader.poll``; frames the motion gate holds back are
+        consumed here.
+        """
+        if self.reader is None:
+            if not self._connecting and not self.closed and time.monotonic() >= self._retry_at:
+                self._connecting = True
+                threading.Thread(target=self._connect, daemon=True).start()
+            return None
+        try:
+            item = self.reader.poll(latest)
+        except Exception:
+            item = None
+            self.reader.ended = True
+        if self.reader.ended:
+            self.disconnect()
+            self._retry_at = time.monotonic() + STREAM_RECONNECT_DELAY
+            return None
+        if item is None:
+            return None
+        self.sampled_frames += 1
+        if self.gate is not None and not self.gate.changed(item[1]):
+            return None
+        return (*item, self.reader.captured_at)
+
+    def observe(self, frame_idx: int, frame: np.ndarray, results, captured_at: float):
+        """Feed one frame's plate-model result to the tracker."""
+        from services.detector import plate_detections, update_tracks
+
+        update_tracks(self.tracker, self.best_detections, frame, plate_detections(results, frame_idx))
+        self._finish(self.tracker.pop_finished())
+        latency = time.monotonic() - captured_at
+        self.inferred_frames += 1
+        self._latency_sum += latency
+        self._latency_count += 1
+        self._latency_max = max(self._latency_max, latency)
+
+    def metrics(self) -> dict:
+        """Frame counters and the latency from reading a frame to its tracker update.
+
+        Latencies cover the frames detected since the previous call.
+        """
+        dropped = self._dropped_before + (self.reader.dropped if self.reader is not None else 0)
+        snapshot = {
+            "camera_id": self.camera_id,
+            "camera": self.name,
+            "connected": self.reader is not None,
+            "sampled_frames": self.sampled_frames,
+            "inferred_frames": self.inferred_frames,
+            "dropped_frames": dropped,
+            "latency_ms_avg": round(self._latency_sum / self._latency_count * 1000, 1) if self._latency_count else None,
+            "latency_ms_max": round(self._latency_max * 1000, 1) if self._latency_count else None,
+            "error": self.error,
+            "updated_at": datetime.utcnow(),
+        }
+        self._latency_sum, self._latency_count, self._latency_max = 0.0, 0, 0.0
+        return snapshot
+
+    def close(self):
+        """Disconnect for good, including from a connection still being opened."""
+        with self._lock:
+            self.closed = True
+        self.disconnect()
+
+    def disconnect(self):
+        """Close the stream and finish every live track.
+
+        The reader is closed on a background thread: its producer may be
+        stuck reading from a stalled source, which must not hold up the
+        scheduler.
+        """
+        if self.reader is not None:
+            self._dropped_before += self.reader.dropped
+            threading.Thread(target=_release_reader, args=(self.reader,), daemon=True).start()
+            self.reader = None
+        self._finish(self.tracker.finish_all())
+        self.gate = MotionGate() if MOTION_GATE else None
+
+    def _finish(self, track_ids: list[int]):
+        self.finished.extend((tid, self.best_detections.pop(tid)) for tid in track_ids if tid in self.best_detections)
+
+    def tag(self, plates: list[dict]) -> list[dict]:
+        seen_at = datetime.utcnow().strftime("%H:%M:%S")
+        for plate in plates:
+            plate.update(camera=self.name, location=self.location, timestamp_in_video=seen_at)
+        return plates
+
+
+def _release_reader(reader: FrameReader):
+    reader.close()
+    reader.cap.release()
+
+
+class StreamScheduler:
+    """Round-robin over the camera streams of one worker process.
+
+    Each ``step`` visits the cameras in turn, starting after the last one
+    served, and takes at most one ready frame from each until
+    ``batch_size`` frames are collected; they go through the plate model in
+    one call. With the ``"latest"`` drop policy each camera's reader keeps
+    only its newest frames and a camera contributes the newest one it has,
+    so a busy node sheds stale frames instead of falling behind; ``"none"``
+    processes every sampled frame and lets the stream's queue push back.
+
+    The worker serves cameras whose id falls on its ``shard`` of ``shards``.
+    Streams of removed cameras are kept until their last tracks are stored.
+    """
+
+    def __init__(self, shard: int = 0, shards: int = 1, batch_size: int = STREAM_BATCH_SIZE, drop_policy: str = STREAM_DROP_POLICY):
+        self.shard = shard
+        self.shards = max(1, shards)
+        self.batch_size = max(1, batch_size)
+        self.latest = drop_policy == "latest"
+        self.streams: dict[int, CameraStream] = {}
+        self._retired: list[CameraStream] = []
+        self._next = 0
+
+    def sync(self, db: Session):
+        """Start streams of this shard's active cameras, close the rest."""
+        wanted = {
+            c.id: c
+            for c in db.query(Camera).filter(Camera.is_active == True, Camera.stream_url.isnot(None)).all()
+            if c.stream_url and c.id % self.shards == self.shard
+        }
+        for camera_id, stream in list(self.streams.items()):
+            camera = wanted.get(camera_id)
+            if camera is None or camera.stream_url != stream.url:
+                stream.close()
+                self._retired.append(self.streams.pop(camera_id))
+        for camera_id, camera in wanted.items():
+            if camera_id not in self.streams:
+                self.streams[camera_id] = CameraStream(
+                    camera.id, camera.name, camera.location, camera.stream_url, keep_latest=self.latest,
+                )
+
+    def next_batch(self) -> list[tuple[CameraStream, int, np.ndarray, float]]:
+        streams = list(self.streams.values())
+        start = self._next
+        batch = []
+        for k in range(len(streams)):
+            if len(batch) >= self.batch_size:
+                break
+            position = (start + k) % len(streams)
+            item = streams[position].poll(self.latest)
+            if item is not None:
+                batch.append((streams[position], *item))
+                self._next = position + 1
+        return batch
+
+    def step(self, db: Session, plate_model) -> bool:
+        """Detect on one batch of frames and store finished tracks; False if no frame was ready."""
+        batch = self.next_batch()
+        if batch:
+            results = plate_model([frame for _, _, frame, _ in batch], verbose=False)
+            for (stream, frame_idx, frame, captured_at), r in zip(batch, results):
+                stream.observe(frame_idx, frame, r, captured_at)
+        self.store_finished(db, [*self.streams.values(), *self._retired])
+        self._retired.clear()
+        for stream in self.streams.values():
+            stream.error = None
+        return bool(batch)
+
+    def store_finished(self, db: Session, streams):
+        """OCR the finished tracks of ``streams`` in one pass and store them.
+
+        Tracks and plates stay on their stream until the commit succeeded,
+        so a failed step is retried by the next one; the error is recorded
+        on the streams and raised.
+        """
+        from services.detector import finalize_track_groups
+        from services.jobs import active_watchlist, store_detections
+
+        pending = [s for s in streams if s.finished]
+        unstored = [s for s in streams if s.finished or s.unstored]
+        if not unstored:
+            return
+        try:
+            groups = finalize_track_groups([(s.finished, s.fps, s.name) for s in pending], strict=True)
+            for stream, plates in zip(pending, groups):
+                stream.unstored.extend(stream.tag(plates))
+                stream.finished = []
+            watchlist_plates = active_watchlist(db)
+            for stream in unstored:
+                store_detections(
+                    db, None, stream.unstored, watchlist_plates, camera=stream.name, location=stream.location,
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for stream in unstored:
+                stream.error = f"{type(e).__name__}: {e}"
+            raise
+        for stream in unstored:
+            stream.unstored = []
+
+    def close(self, db: Session):
+        for stream in self.streams.values():
+            stream.close()
+        self.store_finished(db, [*self.streams.values(), *self._retired])
+        self.streams.clear()
+        self._retired.clear()
+
+
+def run_stream_worker(shard: int, shards: int, stop_event, changed_event, metrics_queue=None, db_url: str = DATABASE_URL):
+    """Worker process body: serve this shard's cameras until ``stop_event`` is set.
+
+    The cameras table is re-read when ``changed_event`` is set and every
+    ``STREAM_MONITOR_INTERVAL`` seconds; each camera's metrics are put on
+    ``metrics_queue`` every ``STREAM_METRICS_INTERVAL`` seconds.
+    """
+    from services.detector import get_plate_model, get_ocr_model
+
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    plate_model = get_plate_model()
+    get_ocr_model()
+    scheduler = StreamScheduler(shard, shards)
+    next_sync = 0.0
+    next_metrics = time.monotonic() + STREAM_METRICS_INTERVAL
+
+    try:
+        while not stop_event.is_set():
+            if changed_event.is_set() or time.monotonic() >= next_sync:
+                changed_event.clear()
+                scheduler.sync(db)
+                next_sync = time.monotonic() + STREAM_MONITOR_INTERVAL
+            if metrics_queue is not None and time.monotonic() >= next_metrics:
+                for stream in scheduler.streams.values():
+                    metrics_queue.put(stream.metrics())
+                next_metrics = time.monotonic() + STREAM_METRICS_INTERVAL
+            try:
+                busy = scheduler.step(db, plate_model)
+            except Exception as e:
+                # Unstored tracks stay on their streams for the next step
+                db.rollback()
+                for stream in scheduler.streams.values():
+                    stream.error = stream.error or f"{type(e).__name__}: {e}"
+                busy = False
+            if not busy:
+                stop_event.wait(0.01)
+    finally:
+        try:
+            scheduler.close(db)
+        finally:
+            db.close()
+            engine.dispose()
+
+
+class StreamManager:
+    """Keeps ``workers`` stream worker processes running.
+
+    ``sync`` restarts dead workers and tells the others to re-read the
+    cameras table; it runs whenever cameras change through the API and
+    every ``STREAM_MONITOR_INTERVAL`` seconds. The latest metrics each
+    camera's worker reported are kept for ``metrics``.
+    """
+
+    def __init__(self, db_url: str = DATABASE_URL, workers: int = STREAM_WORKERS, monitor_interval: float = STREAM_MONITOR_INTERVAL):
+        self.db_url = db_url
+        self.workers = max(1, workers)
+        self.monitor_interval = monitor_interval
+        self._mp = multiprocessing.get_context("spawn")
+        self._workers: dict[int, tuple[multiprocessing.Process, object, object]] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._stop = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self._metrics: dict[int, dict] = {}
+        self._metrics_lock = threading.Lock()
+        self._metrics_queue = None
+        self._listener: Optional[threading.Thread] = None
+
+    def start(self):
+        self._running = True
+        self._stop.clear()
+        self._metrics_queue = self._mp.Queue()
+        self._listener = threading.Thread(target=self._listen_loop, daemon=True)
+        self._listener.start()
+        self.sync()
+        self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._running = False
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        with self._lock:
+            for shard in list(self._workers):
+                self._stop_worker(shard)
+        if self._listener is not None:
+            self._metrics_queue.put(None)
+            self._listener.join()
+            self._listener = None
+
+    def sync(self):
+        if not self._running:
+            return
+        with self._lock:
+            for shard in range(self.workers):
+                if shard in self._workers and not self._workers[shard][0].is_alive():
+                    self._stop_worker(shard)
+                if shard not in self._workers:
+                    stop_event, changed_event = self._mp.Event(), self._mp.Event()
+                    process = self._mp.Process(
+                        target=run_stream_worker,
+                        args=(shard, self.workers, stop_event, changed_event, self._metrics_queue, self.db_url),
+                        daemon=True,
+                    )
+                    process.start()
+                    self._workers[shard] = (process, stop_event, changed_event)
+                self._workers[shard][2].set()
+
+    def status(self) -> dict[int, bool]:
+        """Whether each worker process is running."""
+        with self._lock:
+            return {shard: process.is_alive() for shard, (process, _, _) in self._workers.items()}
+
+    def metrics(self) -> dict[int, dict]:
+        """Latest reported metrics per camera id."""
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+    def _stop_worker(self, shard: int):
+        process, stop_event, _ = self._workers.pop(shard)
+        stop_event.set()
+        process.join(timeout=STREAM_RECONNECT_DELAY + 5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+    def _listen_loop(self):
+        while True:
+            item = self._metrics_queue.get()
+            if item is None:
+                return
+            with self._metrics_lock:
+                self._metrics[item["camera_id"]] = item
+
+    def _monitor_loop(self):
+        while not self._stop.wait(self.monitor_interval):
+            self.sync()
+
+
+stream_manager = StreamManager()
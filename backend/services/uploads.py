@@ -0,0 +1,114 @@
+"""
+Upload storage.
+Uploaded files are written to disk chunk by chunk and hashed on the way,
+so a request never holds a whole recording in memory. Large files can
+also arrive as a resumable upload: appends at known offsets to a partial
+file that survives dropped connections.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from config import UPLOAD_CHUNK_SIZE, PARTIAL_UPLOAD_DIR
+
+
+async def save_upload(source: UploadFile, path: Path) -> str:
+    """Stream an uploaded file to ``path``; return its SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "wb") as f:
+        while chunk := await source.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write(f, digest: "hashlib._Hash", chunk: bytes):
+    f.write(chunk)
+    digest.update(chunk)
+
+
+class OffsetMismatch(ValueError):
+    """An append did not start where the partial file ends."""
+
+
+class PartialUploads:
+    """Partial files of resumable uploads and their running hashes.
+
+    The file size is the upload's offset. The hash of the bytes so far is
+    kept in memory together with the offset it covers; when it is missing
+    or stale, e.g. after a restart, it is rebuilt by reading the file.
+    """
+
+    def __init__(self, directory: Path = PARTIAL_UPLOAD_DIR):
+        self.directory = directory
+        self._digests: dict[str, tuple[int, "hashlib._Hash"]] = {}
+        self._busy: set[str] = set()
+
+    def path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def create(self, upload_id: str):
+        self.path(upload_id).touch()
+        self._digests[upload_id] = (0, hashlib.sha256())
+
+    def offset(self, upload_id: str) -> int:
+        path = self.path(upload_id)
+        return path.stat().st_size if path.exists() else 0
+
+    def _digest(self, upload_id: str) -> "hashlib._Hash":
+        offset = self.offset(upload_id)
+        cached = self._digests.get(upload_id)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(self.path(upload_id), "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes], limit: int) -> int:
+        """Append ``chunks`` at ``offset``, stopping at ``limit`` bytes; return the new offset.
+
+        Bytes received before the client went away are kept, so the next
+        append resumes from there. Rebuilding the hash and writing to disk
+        run in the threadpool, off the event loop.
+        """
+        if upload_id in self._busy:
+            raise OffsetMismatch("Another append to this upload is in progress")
+        if offset != self.offset(upload_id):
+            raise OffsetMismatch(f"Upload is at offset {self.offset(upload_id)}, not {offset}")
+        self._busy.add(upload_id)
+        digest = None
+        written = offset
+        try:
+            digest = await run_in_threadpool(self._digest, upload_id)
+            with open(self.path(upload_id), "ab") as f:
+                async for chunk in chunks:
+                    if written + len(chunk) > limit:
+                        raise ValueError(f"Upload is larger than the announced {limit} bytes")
+                    await run_in_threadpool(_write, f, digest, chunk)
+                    written += len(chunk)
+        finally:
+            if digest is not None:
+                self._digests[upload_id] = (written, digest)
+            self._busy.discard(upload_id)
+        return written
+
+    def finish(self, upload_id: str, dest: Path) -> str:
+        """Move the complete file to ``dest``; return its SHA-256."""
+        file_hash = self._digest(upload_id).hexdigest()
+        os.replace(self.path(upload_id), dest)
+        self._digests.pop(upload_id, None)
+        return file_hash
+
+    def discard(self, upload_id: str):
+        self.path(upload_id).unlink(missing_ok=True)
+        self._digests.pop(upload_id, None)
+
+
+partial_uploads = PartialUploads()
@@ -133,19 +133,88 @@ export interface JobResponse {
   progress: number;
   total_frames: number;
   processed_frames: number;
+  inferred_frames: number;
+  static_frames: number;
   detections_count: number;
   error_message: string | null;
+  parent_id: string | null;
   created_at: string;
   completed_at: string | null;
 }
 
+export interface BatchJobResponse extends JobResponse {
+  files: JobResponse[];
+}
+
+export interface UploadSession {
+  id: string;
+  filename: string;
+  size: number;
+  offset: number;
+}
+
+const RESUMABLE_MIN_SIZE = 32 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+
+// Sends the file in chunks; after a dropped connection it resumes from the offset the server reports
+async function uploadResumable(file: File, onProgress?: (fraction: number) => void, retries = 5): Promise<JobResponse> {
+  const session = await request<UploadSession>("/api/uploads", {
+    method: "POST",
+    body: JSON.stringify({ filename: file.name, size: file.size }),
+  });
+  const currentOffset = async () => (await request<UploadSession>(`/api/uploads/${session.id}`)).offset;
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    let res: Response;
+    try {
+      res = await fetch(`${API_BASE}/api/uploads/${session.id}`, {
+        method: "PATCH",
+        headers: {
+          Authorization: `Bearer ${getToken()}`,
+          "Content-Type": "application/octet-stream",
+          "Upload-Offset": String(offset),
+        },
+        body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+      });
+    } catch (err) {
+      if (++failures > retries) throw err;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      offset = await currentOffset();
+      continue;
+    }
+    if (res.ok) {
+      offset = (await res.json()).offset;
+      failures = 0;
+    } else if (res.status === 409) {
+      offset = await currentOffset();
+    } else {
+      const error = await res.json().catch(() => ({ detail: res.statusText }));
+      throw new Error(error.detail || "Upload failed");
+    }
+    onProgress?.(offset / file.size);
+  }
+  return request<JobResponse>(`/api/uploads/${session.id}/complete`, { method: "POST" });
+}
+
 export const uploadApi = {
-  upload: (file: File) => {
+  upload: (file: File, onProgress?: (fraction: number) => void) => {
+    if (file.size >= RESUMABLE_MIN_SIZE) return uploadResumable(file, onProgress);
     const formData = new FormData();
     formData.append("file", file);
     return request<JobResponse>("/api/upload", { method: "POST", body: formData });
   },
+  // Images and/or zip archives of images, processed as one batch job
+  uploadBatch: (files: File[]) => {
+    const formData = new FormData();
+    files.forEach((f) => formData.append("files", f));
+    return request<BatchJobResponse>("/api/upload/batch", { method: "POST", body: formData });
+  },
   jobStatus: (jobId: string) => request<JobResponse>(`/api/jobs/${jobId}`),
+  jobFiles: (jobId: string) => request<JobResponse[]>(`/api/jobs/${jobId}/files`),
+  // Server-sent "progress" (JobResponse) and "detection" (DetectionResponse) events
+  jobEvents: (jobId: string) => new EventSource(`${API_BASE}/api/jobs/${jobId}/events`),
 };
 
 // ── Vehicles ─────────────────────────────────────────────────────────
@@ -280,14 +349,28 @@ export interface SettingResponse {
   updated_at: string;
 }
 
+export interface CameraStreamMetrics {
+  camera_id: number;
+  camera: string;
+  connected: boolean;
+  sampled_frames: number;
+  inferred_frames: number;
+  dropped_frames: number;
+  latency_ms_avg: number | null;
+  latency_ms_max: number | null;
+  error: string | null;
+  updated_at: string;
+}
+
 export const settingsApi = {
   list: () => request<SettingResponse[]>("/api/settings"),
   update: (key: string, value: string) =>
     request<SettingResponse>(`/api/settings/${key}`, { method: "PUT", body: JSON.stringify({ value }) }),
-  cameras: () => request<{ id: number; name: string; location: string; speed_limit: number; is_active: boolean }[]>("/api/settings/cameras"),
-  addCamera: (data: { name: string; location: string; speed_limit?: number }) =>
+  cameras: () => request<{ id: number; name: string; location: string; speed_limit: number; stream_url: string | null; is_active: boolean }[]>("/api/settings/cameras"),
+  addCamera: (data: { name: string; location: string; speed_limit?: number; stream_url?: string }) =>
     request<unknown>("/api/settings/cameras", { method: "POST", body: JSON.stringify(data) }),
   deleteCamera: (id: number) => request<unknown>(`/api/settings/cameras/${id}`, { method: "DELETE" }),
+  cameraMetrics: () => request<CameraStreamMetrics[]>("/api/settings/cameras/metrics"),
 };
 
 // ── Static file URL helper ───────────────────────────────────────────
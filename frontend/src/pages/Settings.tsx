@@ -1,13 +1,14 @@
 import { useState, useEffect } from "react";
 import { motion } from "framer-motion";
 import { Settings as SettingsIcon, Camera, Plus, Trash2, Loader2, Save, X } from "lucide-react";
-import { settingsApi, type SettingResponse } from "@/lib/api";
+import { settingsApi, type SettingResponse, type CameraStreamMetrics } from "@/lib/api";
 
 interface CameraEntry {
   id: number;
   name: string;
   location: string;
   speed_limit: number;
+  stream_url: string | null;
   is_active: boolean;
 }
 
@@ -18,8 +19,9 @@ export default function SettingsPage() {
   const [editValues, setEditValues] = useState<Record<string, string>>({});
   const [saving, setSaving] = useState<string | null>(null);
   const [showCameraModal, setShowCameraModal] = useState(false);
-  const [cameraForm, setCameraForm] = useState({ name: "", location: "", speed_limit: 60 });
+  const [cameraForm, setCameraForm] = useState({ name: "", location: "", speed_limit: 60, stream_url: "" });
   const [addingCamera, setAddingCamera] = useState(false);
+  const [metrics, setMetrics] = useState<Record<number, CameraStreamMetrics>>({});
 
   useEffect(() => {
     Promise.all([settingsApi.list(), settingsApi.cameras()])
@@ -34,6 +36,17 @@ export default function SettingsPage() {
       .finally(() => setLoading(false));
   }, []);
 
+  useEffect(() => {
+    const load = () =>
+      settingsApi
+        .cameraMetrics()
+        .then((list) => setMetrics(Object.fromEntries(list.map((m) => [m.camera_id, m]))))
+        .catch(() => {});
+    load();
+    const timer = setInterval(load, 5000);
+    return () => clearInterval(timer);
+  }, []);
+
   const handleSave = async (key: string) => {
     setSaving(key);
     try {
@@ -50,11 +63,11 @@ export default function SettingsPage() {
     e.preventDefault();
     setAddingCamera(true);
     try {
-      await settingsApi.addCamera(cameraForm);
+      await settingsApi.addCamera({ ...cameraForm, stream_url: cameraForm.stream_url || undefined });
       const updatedCameras = await settingsApi.cameras();
       setCameras(updatedCameras);
       setShowCameraModal(false);
-      setCameraForm({ name: "", location: "", speed_limit: 60 });
+      setCameraForm({ name: "", location: "", speed_limit: 60, stream_url: "" });
     } catch {
       // ignore
     } finally {
@@ -152,8 +165,19 @@ export default function SettingsPage() {
                 <div className="flex-1">
                   <div className="text-sm font-medium">{cam.name}</div>
                   <div className="text-xs text-muted-foreground">
-                    {cam.location} • {cam.speed_limit} km/h limit
+                    {cam.location} • {cam.speed_limit} km/h limit{cam.stream_url && " • Live stream"}
                   </div>
+                  {cam.stream_url && metrics[cam.id] && (
+                    <div className="text-xs text-muted-foreground">
+                      {metrics[cam.id].connected ? "Connected" : "Reconnecting"}
+                      {metrics[cam.id].latency_ms_avg !== null &&
+                        ` • ${Math.round(metrics[cam.id].latency_ms_avg!)} ms latency (max ${Math.round(metrics[cam.id].latency_ms_max!)} ms)`}
+                      {` • ${metrics[cam.id].dropped_frames} dropped frames`}
+                    </div>
+                  )}
+                  {cam.stream_url && metrics[cam.id]?.error && (
+                    <div className="text-xs text-destructive">Not saving detections: {metrics[cam.id].error}</div>
+                  )}
                 </div>
                 <button
                   onClick={() => handleDeleteCamera(cam.id)}
@@ -213,6 +237,15 @@ export default function SettingsPage() {
                   max={200}
                 />
               </div>
+              <div>
+                <label className="block text-sm font-medium mb-1.5">Stream URL (optional)</label>
+                <input
+                  value={cameraForm.stream_url}
+                  onChange={(e) => setCameraForm((f) => ({ ...f, stream_url: e.target.value }))}
+                  className="w-full px-4 py-2.5 rounded-lg bg-secondary border border-border text-sm focus:outline-none focus:ring-1 focus:ring-primary/50"
+                  placeholder="e.g. rtsp://192.168.1.20:554/stream1"
+                />
+              </div>
               <button
                 type="submit"
                 disabled={addingCamera}
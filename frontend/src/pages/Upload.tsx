@@ -1,7 +1,7 @@
 import { useState, useCallback, useRef } from "react";
 import { motion } from "framer-motion";
 import { Upload as UploadIcon, FileVideo, FileImage, X, CheckCircle2, AlertCircle, Loader2 } from "lucide-react";
-import { uploadApi, type JobResponse } from "@/lib/api";
+import { uploadApi, type JobResponse, type DetectionResponse } from "@/lib/api";
 
 type UploadState = "idle" | "uploading" | "processing" | "completed" | "error";
 
@@ -13,6 +13,9 @@ export default function UploadPage() {
   const [error, setError] = useState("");
   const inputRef = useRef<HTMLInputElement>(null);
   const pollRef = useRef<ReturnType<typeof setInterval>>();
+  const eventsRef = useRef<EventSource>();
+  const [liveDetections, setLiveDetections] = useState<DetectionResponse[]>([]);
+  const [uploadProgress, setUploadProgress] = useState(0);
 
   const accept = ".mp4,.avi,.mov,.mkv,.wmv,.jpg,.jpeg,.png,.bmp";
 
@@ -33,34 +36,55 @@ export default function UploadPage() {
     [handleFile]
   );
 
+  const applyJob = (updated: JobResponse) => {
+    setJob(updated);
+    if (updated.status === "completed" || updated.status === "failed") {
+      eventsRef.current?.close();
+      clearInterval(pollRef.current);
+      setState(updated.status === "completed" ? "completed" : "error");
+      if (updated.status === "failed") setError(updated.error_message || "Processing failed");
+      return true;
+    }
+    return false;
+  };
+
+  const pollJob = (jobId: string) => {
+    pollRef.current = setInterval(async () => {
+      try {
+        applyJob(await uploadApi.jobStatus(jobId));
+      } catch {
+        clearInterval(pollRef.current);
+        setState("error");
+        setError("Failed to check job status");
+      }
+    }, 1500);
+  };
+
   const handleUpload = async () => {
     if (!file) return;
     setState("uploading");
     setError("");
+    setLiveDetections([]);
+    setUploadProgress(0);
     try {
-      const result = await uploadApi.upload(file);
-      setJob(result);
+      const result = await uploadApi.upload(file, setUploadProgress);
 
-      if (result.file_type === "video" && result.status !== "completed") {
+      // Images usually come back finished; anything still queued is followed like a video
+      if (!applyJob(result)) {
         setState("processing");
-        // Poll for progress
-        pollRef.current = setInterval(async () => {
-          try {
-            const updated = await uploadApi.jobStatus(result.id);
-            setJob(updated);
-            if (updated.status === "completed" || updated.status === "failed") {
-              clearInterval(pollRef.current);
-              setState(updated.status === "completed" ? "completed" : "error");
-              if (updated.status === "failed") setError(updated.error_message || "Processing failed");
-            }
-          } catch {
-            clearInterval(pollRef.current);
-            setState("error");
-            setError("Failed to check job status");
-          }
-        }, 1500);
-      } else {
-        setState("completed");
+        // Progress and detections are pushed; fall back to polling if the stream drops
+        const events = uploadApi.jobEvents(result.id);
+        eventsRef.current = events;
+        events.addEventListener("progress", (e) => applyJob(JSON.parse((e as MessageEvent).data)));
+        events.addEventListener("detection", (e) => {
+          const detection: DetectionResponse = JSON.parse((e as MessageEvent).data);
+          setLiveDetections((prev) => [detection, ...prev].slice(0, 10));
+        });
+        events.onerror = () => {
+          if (events.readyState === EventSource.CLOSED || eventsRef.current !== events) return;
+          events.close();
+          pollJob(result.id);
+        };
       }
     } catch (err: unknown) {
       setState("error");
@@ -70,6 +94,9 @@ export default function UploadPage() {
 
   const reset = () => {
     if (pollRef.current) clearInterval(pollRef.current);
+    eventsRef.current?.close();
+    eventsRef.current = undefined;
+    setLiveDetections([]);
     setFile(null);
     setState("idle");
     setJob(null);
@@ -163,7 +190,7 @@ export default function UploadPage() {
                 <motion.div
                   className="h-full gradient-primary rounded-full"
                   initial={{ width: 0 }}
-                  animate={{ width: `${job?.progress || (state === "uploading" ? 30 : 0)}%` }}
+                  animate={{ width: `${job?.progress || (state === "uploading" ? Math.max(uploadProgress * 100, 30) : 0)}%` }}
                   transition={{ duration: 0.5 }}
                 />
               </div>
@@ -172,6 +199,15 @@ export default function UploadPage() {
                   Frame {job.processed_frames} / {job.total_frames}
                 </p>
               )}
+              {liveDetections.length > 0 && (
+                <div className="flex flex-wrap gap-1.5 mt-2">
+                  {liveDetections.map((d) => (
+                    <span key={d.id} className="px-2 py-0.5 rounded bg-secondary text-xs font-mono">
+                      {d.plate_number}
+                    </span>
+                  ))}
+                </div>
+              )}
             </div>
           )}
 